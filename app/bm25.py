@@ -0,0 +1,113 @@
+import json  # Importing json to persist indexes
+import math  # Importing math for the IDF formula
+import os  # Importing os module to access environment variables and the filesystem
+import re  # Importing re module to tokenize text
+import threading  # Importing threading to guard the lazily loaded index cache
+from collections import Counter  # Importing Counter to count term frequencies
+from typing import Dict, List, Optional, Tuple  # Importing typing helpers for type hinting
+from .registry import registry  # Importing the process-wide client registry
+
+# Directory holding one keyword index per PDF
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", "./bm25_index")
+# BM25 term-frequency saturation and length normalization parameters
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Keeping formulas, versions and section numbers such as "3.2.1", "h2o" or "x-ray" as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-'][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    # Inverted index over one document's chunks
+
+    def __init__(self, postings: Dict[str, List[Tuple[int, int]]], lengths: List[int], texts: List[str],
+                 metadata: Optional[List[dict]] = None):
+        self.postings = postings  # term -> [(chunk index, term frequency)]
+        self.lengths = lengths  # Token count of each chunk
+        self.texts = texts  # Chunk texts, so keyword hits can be returned without another backend
+        self.metadata = metadata or [{} for _ in texts]  # Page numbers and offsets of each chunk
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    @classmethod
+    def build(cls, texts: List[str], metadata: Optional[List[dict]] = None) -> "BM25Index":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings.setdefault(term, []).append((i, frequency))
+        return cls(postings, lengths, list(texts), metadata)
+
+    def query(self, text: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        # Scoring only the chunks that contain at least one query term
+        count = len(self.lengths)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, frequency in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / (self.average_length or 1))
+                scores[i] = scores.get(i, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def to_dict(self) -> dict:
+        return {"postings": self.postings, "lengths": self.lengths, "texts": self.texts, "metadata": self.metadata}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        return cls(postings, data["lengths"], data["texts"], data.get("metadata"))
+
+class BM25Store:
+    # One persisted index per document, loaded lazily on the first question about it
+
+    def __init__(self, directory: str = BM25_INDEX_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._indexes: Dict[str, BM25Index] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, document_id: str) -> str:
+        return os.path.join(self.directory, f"{document_id}.json")
+
+    def add(self, document_id: str, texts: List[str], metadata: Optional[List[dict]] = None):
+        index = BM25Index.build(texts, metadata)
+        path = self._path(document_id)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(f"{path}.tmp", path)
+        with self._lock:
+            self._indexes[document_id] = index
+
+    def get(self, document_id: str) -> Optional[BM25Index]:
+        with self._lock:
+            if document_id not in self._indexes:
+                path = self._path(document_id)
+                if not os.path.exists(path):
+                    return None
+                with open(path, encoding="utf-8") as f:
+                    self._indexes[document_id] = BM25Index.from_dict(json.load(f))
+            return self._indexes[document_id]
+
+    def query(self, document_id: str, text: str, top_k: int = 10) -> List[dict]:
+        # Returning matches in the same shape as the vector stores
+        index = self.get(document_id)
+        if index is None:
+            return []
+        return [
+            {"id": f"{document_id}-{i}", "score": score, "text": index.texts[i], "metadata": index.metadata[i]}
+            for i, score in index.query(text, top_k)
+        ]
+
+    def has_document(self, document_id: str) -> bool:
+        return os.path.exists(self._path(document_id))
+
+registry.register("bm25_store", BM25Store)
+
+def get_bm25_store() -> BM25Store:
+    return registry.get("bm25_store")
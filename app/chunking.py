@@ -0,0 +1,146 @@
+import os  # Importing os module to access environment variables
+import re  # Importing re module to find headings, sentences and words
+from typing import Iterable, Iterator, List, Tuple  # Importing typing helpers for type hinting
+from .retrieval import count_tokens  # Importing the shared token counter so chunks match the prompt budget
+
+# Target size of a chunk, in tokens; a handful of these fit the context budget instead of one 10,000-character chunk
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "400"))
+# Tokens of trailing text repeated at the start of the next chunk, so a sentence cut at a boundary stays retrievable
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+# Bump whenever chunking changes so re-uploading a document indexed by an older chunker indexes it again
+CHUNKER_VERSION = 2
+
+# Short lines that look like section titles: "2.3 Results", "CHAPTER 4", "Chapter 4: Methods", "Introduction"
+HEADING_PATTERN = re.compile(
+    r"^(?:(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.|chapter\s+\w+|section\s+\w+)\s+\S.*|[A-Z][A-Za-z0-9 ,:&()'\-]*)$",
+    re.IGNORECASE,
+)
+HEADING_MAX_CHARS = 80
+SENTENCE_PATTERN = re.compile(r"[^.!?]+(?:[.!?]+|$)\s*")
+WORD_PATTERN = re.compile(r"\S+\s*")
+
+# A block of text on one page: (text, page, char start, char end, starts a section, token count)
+Block = Tuple[str, int, int, int, bool, int]
+
+class Chunk:
+    # A chunk of a document with the page span and offsets it was cut from
+
+    def __init__(self, text: str, page_start: int, page_end: int, char_start: int, char_end: int):
+        self.text = text
+        self.page_start = page_start  # 1-based page the chunk starts on
+        self.page_end = page_end  # Page the chunk ends on
+        self.char_start = char_start  # Offset into the text of page_start
+        self.char_end = char_end  # Offset into the text of page_end
+
+    def metadata(self) -> dict:
+        return {
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "char_start": self.char_start,
+            "char_end": self.char_end,
+        }
+
+def is_heading(line: str) -> bool:
+    # Headings are short, do not end like a sentence and are numbered or capitalized
+    line = line.strip()
+    if not line or len(line) > HEADING_MAX_CHARS or line[-1] in ".,;":
+        return False
+    if HEADING_PATTERN.match(line) is None:
+        return False
+    words = line.split()
+    # Requiring most words to be capitalized, so an ordinary short line of prose is not taken for a title
+    capitalized = sum(1 for word in words if word[0].isupper() or word[0].isdigit())
+    return capitalized * 2 >= len(words)
+
+def split_page_blocks(text: str, page: int) -> Iterator[Block]:
+    # Splitting a page into paragraphs at blank lines, starting a new block at every heading
+    start = None
+    end = 0
+    heading = False
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        line_start, offset = offset, offset + len(line)
+        if not line.strip():
+            if start is not None:
+                yield make_block(text, page, start, end, heading)
+                start = None
+            continue
+        if is_heading(line) and start is not None:
+            yield make_block(text, page, start, end, heading)
+            start = None
+        if start is None:
+            start, heading = line_start, is_heading(line)
+        end = line_start + len(line.rstrip())
+    if start is not None:
+        yield make_block(text, page, start, end, heading)
+
+def make_block(text: str, page: int, start: int, end: int, heading: bool) -> Block:
+    block_text = text[start:end]
+    return (block_text, page, start, end, heading, count_tokens(block_text))
+
+def split_oversized(block: Block, target: int) -> Iterator[Block]:
+    # Splitting a block larger than the target at sentence boundaries, then at word boundaries
+    text, page, start, _, heading, tokens = block
+    if tokens <= target:
+        yield block
+        return
+    pattern = SENTENCE_PATTERN if len(SENTENCE_PATTERN.findall(text)) > 1 else WORD_PATTERN
+    piece_start = piece_end = 0
+    piece_tokens = 0
+    pieces = []
+    for match in pattern.finditer(text):
+        part_tokens = count_tokens(match.group())
+        if piece_tokens and piece_tokens + part_tokens > target:
+            pieces.append((piece_start, piece_end))
+            piece_start, piece_tokens = match.start(), 0
+        piece_end = match.start() + len(match.group().rstrip())
+        piece_tokens += part_tokens
+    if piece_tokens:
+        pieces.append((piece_start, piece_end))
+    if len(pieces) == 1:  # A single word longer than the target is kept whole
+        yield block
+        return
+    for i, (piece_start, piece_end) in enumerate(pieces):
+        piece = make_block(text, page, piece_start, piece_end, heading and i == 0)
+        # Offsets are relative to the block, so shifting them back to page offsets
+        piece = (piece[0], page, start + piece_start, start + piece_end, piece[4], piece[5])
+        yield from split_oversized(piece, target)
+
+def iter_blocks(pages: Iterable[str], target: int) -> Iterator[Block]:
+    for page, page_text in enumerate(pages, start=1):
+        for block in split_page_blocks(page_text, page):
+            yield from split_oversized(block, target)
+
+def build_chunk(blocks: List[Block]) -> Chunk:
+    first, last = blocks[0], blocks[-1]
+    return Chunk("\n\n".join(block[0] for block in blocks), first[1], last[1], first[2], last[3])
+
+def chunk_pages(pages: Iterable[str], target_tokens: int = CHUNK_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> Iterator[Chunk]:
+    # Packing paragraphs into chunks of about target_tokens while pages are still being extracted;
+    # a heading closes the current chunk once it is half full, so chunks tend to hold one section
+    current: List[Block] = []
+    current_tokens = 0
+    fresh = False  # Whether current holds anything besides the overlap carried from the previous chunk
+    for block in iter_blocks(pages, target_tokens):
+        tokens, heading = block[5], block[4]
+        starts_section = heading and current_tokens >= target_tokens // 2
+        if fresh and (starts_section or current_tokens + tokens > target_tokens):
+            yield build_chunk(current)
+            # Carrying the trailing blocks into the next chunk, except across a section boundary
+            carried: List[Block] = []
+            carried_tokens = 0
+            if not starts_section:
+                for previous in reversed(current):
+                    if carried_tokens + previous[5] > overlap_tokens:
+                        break
+                    carried.insert(0, previous)
+                    carried_tokens += previous[5]
+            current, current_tokens, fresh = carried, carried_tokens, False
+        if heading and not fresh:
+            current, current_tokens = [], 0  # Overlap from before a heading would only dilute the new section
+        current.append(block)
+        current_tokens += tokens
+        fresh = True
+    if fresh:
+        yield build_chunk(current)
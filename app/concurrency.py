@@ -0,0 +1,55 @@
+import asyncio  # Importing asyncio to hand blocking work to the thread pool
+import functools  # Importing functools to bind call arguments
+import os  # Importing os module to access environment variables
+import time  # Importing time for the rate limiter's clock
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor for the bounded blocking pool
+from typing import Any, Callable, Optional  # Importing typing helpers for type hinting
+from .metrics import bind_context  # Importing context binding so spans in worker threads reach the request trace
+
+# Maximum number of blocking calls (SDKs without async clients, file and database I/O) running at once
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "32"))
+
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")  # Shared pool for blocking calls
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    # Running a blocking call on the bounded pool so the event loop keeps serving other requests
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, bind_context(functools.partial(func, *args, **kwargs)))
+
+class RateLimiter:
+    # Token bucket for provider quotas: at most `rate` calls per `period` seconds, waiting callers served in order
+
+    def __init__(self, rate: float, period: float = 60.0, capacity: Optional[float] = None):
+        self.per_second = rate / period if rate > 0 else 0.0  # 0 disables limiting
+        self.capacity = capacity or max(1.0, rate)  # A full period's quota may be used at once
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    async def acquire(self, cost: float = 1.0):
+        # Waiting until `cost` calls fit in the quota
+        if not self.per_second:
+            return
+        cost = min(cost, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((cost - self.tokens) / self.per_second)
+
+    def pause(self, seconds: float):
+        # Backing off after the provider reported a rate limit: nothing is admitted for a while, then the bucket refills
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
@@ -1,25 +1,92 @@
-from sqlalchemy import create_engine  # Importing create_engine function from SQLAlchemy to create a database engine
+from sqlalchemy import create_engine, event  # Importing create_engine function and the event API from SQLAlchemy
+from sqlalchemy.engine import make_url  # Importing make_url to inspect the configured backend
 from sqlalchemy.ext.declarative import declarative_base  # Importing declarative_base function to create a base class for our models
 from sqlalchemy.orm import sessionmaker  # Importing sessionmaker to create a configured Session class
 import os  # Importing os module to access environment variables
+import time  # Importing time to time queries
+from .metrics import observe  # Importing the stage recorder for query timings
 
 # Getting the database URL from environment variables, with a fallback to a local SQLite database
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+# Optional async URL (e.g. sqlite+aiosqlite:///./sql_app.db or postgresql+asyncpg://...) enabling AsyncSessionLocal
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Connection pool settings for server databases (SQLite uses SQLAlchemy's defaults)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def engine_options(url: str) -> dict:
+    # Choosing engine arguments for the configured backend
+    if is_sqlite(url):
+        # For SQLite, setting check_same_thread to False to allow usage in multiple threads
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,  # Replacing connections the server closed while idle
+    }
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run while a writer commits; NORMAL sync is safe in WAL mode and much faster
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # Recording every statement under the "db.query" stage of /metrics and the request trace
+    observe("db.query", time.perf_counter() - conn.info["query_started"].pop())
+
+def discard_query_timer(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", start_query_timer)
+    event.listen(sync_engine, "after_cursor_execute", stop_query_timer)
+    event.listen(sync_engine, "handle_error", discard_query_timer)
 
 # Creating a database engine with the specified URL
-# For SQLite, setting check_same_thread to False to allow usage in multiple threads
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+if is_sqlite(SQLALCHEMY_DATABASE_URL):
+    event.listen(engine, "connect", set_sqlite_pragmas)
+instrument_engine(engine)
 
 # Creating a configured Session class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Creating the optional async engine and session class when an async driver URL is configured
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DATABASE_URL:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # Importing the asyncio extension only when used
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+    if is_sqlite(ASYNC_DATABASE_URL):
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 # Creating a base class for our models to inherit from
 Base = declarative_base()
 
 def init_db():
     # Importing all classes that extend Base here to ensure they are registered with SQLAlchemy
-    from .models import PDFFile, PDFEmbedding
+    from .models import PDFFile, PDFEmbedding, YouTubeTranscript, BatchJob, BatchJobItem
+    from .migrations import run_migrations
     # Creating all tables in the database that are defined by classes extending Base
     Base.metadata.create_all(bind=engine)
+    # Upgrading tables created by earlier versions (new columns, packed embeddings)
+    run_migrations(engine)
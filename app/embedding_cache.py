@@ -0,0 +1,135 @@
+import hashlib  # Importing hashlib to address cached embeddings by text digest
+import os  # Importing os module to access environment variables
+import sqlite3  # Importing sqlite3 for the on-disk cache layer
+import threading  # Importing threading to share the cache between worker threads
+import time  # Importing time to record last access for eviction
+from collections import OrderedDict  # Importing OrderedDict for the in-memory LRU layer
+from typing import Dict, List, Optional, Sequence  # Importing typing helpers for type hinting
+import numpy as np  # Importing NumPy to pack cached vectors
+from .metrics import register_cache  # Importing the hook exporting cache counters on /metrics
+
+# Whether embeddings are cached at all, where the disk layer lives and how large each layer may grow
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "10000"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    # Content-addressed cache keyed by (model name, SHA-256 of text): memory LRU in front of SQLite
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS,
+                 max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL, PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+        self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        register_cache("embedding", self.stats)
+
+    def _remember(self, key: tuple, vector: np.ndarray):
+        # Inserting into the LRU layer, dropping the least recently used entries beyond the limit
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        keys = [(model, text_digest(text)) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self._lock:
+            missing: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[i] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key[1], []).append(i)
+
+            digests = list(missing)
+            now = time.time()
+            for start in range(0, len(digests), 500):  # Staying below SQLite's bound parameter limit
+                batch = digests[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for digest, blob in rows:
+                    vector = np.frombuffer(blob, dtype="<f4")
+                    self._remember((model, digest), vector)
+                    for i in missing.pop(digest):
+                        results[i] = vector
+                        self.disk_hits += 1
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, digest) for digest, _ in rows]
+                )
+            self._conn.commit()
+            self.misses += sum(len(indexes) for indexes in missing.values())
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                array = np.asarray(vector, dtype="<f4")
+                digest = text_digest(text)
+                self._remember((model, digest), array)
+                blob = array.tobytes()
+                rows.append((model, digest, blob, len(blob), now))
+            for row in rows:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount:
+                    self._disk_bytes += row[3]  # Counting only rows that were not already cached
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Deleting the least recently used rows until the disk layer is back under 90% of its budget
+        if self._disk_bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self._disk_bytes > target:
+            rows = self._conn.execute(
+                "SELECT model, text_hash, size FROM embeddings ORDER BY last_access LIMIT 500"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            self._conn.executemany(
+                "DELETE FROM embeddings WHERE model = ? AND text_hash = ?",
+                [(model, digest) for model, digest, _ in rows]
+            )
+            self._disk_bytes -= sum(size for _, _, size in rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
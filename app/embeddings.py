@@ -0,0 +1,206 @@
+import asyncio  # Importing asyncio for bounded concurrent embedding requests
+import hashlib  # Importing hashlib to hash tokens for the fake backend
+import logging  # Importing logging module to report retries
+import os  # Importing os module to access environment variables
+import random  # Importing random to add jitter to retry delays
+import re  # Importing re module to tokenize text for the fake backend
+import time  # Importing time for retry delays and fake latency
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor for the synchronous batch path
+from typing import List, Optional  # Importing typing helpers for type hinting
+import numpy as np  # Importing NumPy to build fake embeddings
+from .concurrency import run_blocking  # Importing the bounded thread pool for blocking calls
+from .metrics import span  # Importing the stage timer
+from .providers import use_fakes  # Importing the provider switch that picks the default backend
+from .registry import registry  # Importing the process-wide client registry
+from .embedding_cache import EmbeddingCache, EMBEDDING_CACHE_ENABLED  # Importing the persistent embedding cache
+
+logger = logging.getLogger(__name__)  # Creating a logger instance
+
+# Embedding backend ("google" or "fake") and model name
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "fake" if use_fakes() else "google")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "768"))
+# Texts per embed_documents call and number of calls in flight at once
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+# Retries on rate-limit errors, with exponential backoff starting at the base delay (seconds)
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+EMBEDDING_RETRY_BASE_DELAY = float(os.getenv("EMBEDDING_RETRY_BASE_DELAY", "1.0"))
+# Simulated latency per batch for the fake backend (seconds)
+EMBEDDING_FAKE_LATENCY = float(os.getenv("EMBEDDING_FAKE_LATENCY", "0"))
+
+class FakeEmbeddingBackend:
+    # Deterministic offline backend: hashed bag-of-words vectors, so texts sharing words are similar
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, latency: float = EMBEDDING_FAKE_LATENCY):
+        self.dimension = dimension
+        self.latency = latency
+        self.calls = 0  # Number of backend calls, useful for checking batching
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(token.encode()).hexdigest(), 16) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+def is_rate_limit_error(error: Exception) -> bool:
+    # Recognizing HTTP 429 / quota errors from the different client libraries
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if callable(code):
+        code = code()
+    if code == 429 or getattr(code, "value", None) == 429:
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return "429" in message or "resourceexhausted" in message or "rate limit" in message or "quota" in message
+
+class EmbeddingClient:
+    # Shared client: serves repeats from the cache, batches the rest, bounds concurrency and backs off on rate limits
+
+    def __init__(self, backend, model_name: str = EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_concurrency: int = EMBEDDING_CONCURRENCY, max_retries: int = EMBEDDING_MAX_RETRIES,
+                 retry_base_delay: float = EMBEDDING_RETRY_BASE_DELAY, cache: Optional[EmbeddingCache] = None):
+        self.backend = backend
+        self.cache = cache
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        return [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Exponential backoff with jitter so parallel batches do not retry in lockstep
+        return self.retry_base_delay * (2 ** attempt) * (0.5 + random.random())
+
+    def _with_retry(self, func, *args):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limit_error(e):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"Embedding rate limited, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    async def _awith_retry(self, func, *args):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func(*args)
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limit_error(e):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"Embedding rate limited, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        with span("embedding.batch"):
+            return self._with_retry(self.backend.embed_documents, texts)
+
+    async def _aembed_batch(self, texts: List[str], semaphore: asyncio.Semaphore) -> List[List[float]]:
+        async with semaphore:
+            with span("embedding.batch"):
+                return await self._awith_retry(self.backend.aembed_documents, texts)
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        # Synchronous path for worker threads: batches run on a bounded thread pool
+        batches = self._batches(texts)
+        if len(batches) <= 1:
+            return self._embed_batch(texts) if texts else []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = executor.map(self._embed_batch, batches)
+            return [embedding for batch in results for embedding in batch]
+
+    async def _aembed_uncached(self, texts: List[str]) -> List[List[float]]:
+        # Asynchronous path: batches run concurrently, at most max_concurrency at a time
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self._aembed_batch(batch, semaphore) for batch in self._batches(texts)))
+        return [embedding for batch in results for embedding in batch]
+
+    def _merge(self, texts: List[str], cached: list, unique: List[str], fresh: list) -> list:
+        # Filling cache misses with freshly computed vectors, in the original order
+        computed = dict(zip(unique, fresh))
+        return [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self._embed_uncached(texts)
+        cached = self.cache.get_many(self.model_name, texts)
+        unique = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        fresh = self._embed_uncached(unique)
+        self.cache.put_many(self.model_name, unique, fresh)
+        return self._merge(texts, cached, unique, fresh)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return await self._aembed_uncached(texts)
+        cached = await run_blocking(self.cache.get_many, self.model_name, texts)
+        unique = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        fresh = await self._aembed_uncached(unique)
+        await run_blocking(self.cache.put_many, self.model_name, unique, fresh)
+        return self._merge(texts, cached, unique, fresh)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries go through embed_query so backends can use their retrieval-query task type
+        query_model = f"{self.model_name}:query"
+        if self.cache is not None:
+            cached = self.cache.get_many(query_model, [text])[0]
+            if cached is not None:
+                return cached
+        with span("embedding.query"):
+            vector = self._with_retry(self.backend.embed_query, text)
+        if self.cache is not None:
+            self.cache.put_many(query_model, [text], [vector])
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        query_model = f"{self.model_name}:query"
+        if self.cache is not None:
+            cached = (await run_blocking(self.cache.get_many, query_model, [text]))[0]
+            if cached is not None:
+                return cached
+        with span("embedding.query"):
+            vector = await self._awith_retry(self.backend.aembed_query, text)
+        if self.cache is not None:
+            await run_blocking(self.cache.put_many, query_model, [text], [vector])
+        return vector
+
+def create_embedding_backend(name: str = EMBEDDING_BACKEND):
+    if name == "fake":
+        return FakeEmbeddingBackend()
+    if name == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings  # Importing lazily so offline runs do not need it
+        return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {name}")
+
+def build_embedding_client() -> EmbeddingClient:
+    cache = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
+    return EmbeddingClient(create_embedding_backend(), cache=cache)
+
+registry.register("embedding_client", build_embedding_client, eager=True)  # Building the client once, at startup
+
+def get_embedding_client() -> EmbeddingClient:
+    # Reusing the client for ingestion and questions
+    return registry.get("embedding_client")
@@ -1,48 +1,146 @@
+import time
+
+import_started = time.perf_counter()  # Measuring how long the application modules take to import
+
+import logging
+import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from .services import pdf_service, questionnaire_service, youtube_service, notes_service
+from typing import Dict, List
+from fastapi import APIRouter, FastAPI, Request, Response
+from .services import pdf_service, questionnaire_service, youtube_service, notes_service, batch_service
 from app.database import init_db
+from app.concurrency import run_blocking
+from app.metrics import REQUESTS_IN_PROGRESS, finish_trace, render_metrics, slowest_traces, start_trace
+from app.pdf_extraction import shutdown_extract_pool
+from app.registry import registry
+
+import_seconds = time.perf_counter() - import_started
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Initialize the database by creating the necessary tables
-init_db()
+# Configuring logging once for the whole application
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+# Build clients and chains during startup instead of on the first request (set to false for faster reloads)
+WARM_STARTUP = os.getenv("WARM_STARTUP", "true").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Initialize the database by creating the necessary tables
+    await run_blocking(init_db)
+    # Building every eagerly registered client and chain once for the whole process
+    build_times = await run_blocking(registry.warm) if WARM_STARTUP else {}
+    app.state.startup_timings = {
+        "import_seconds": round(import_seconds, 4),
+        "startup_seconds": round(time.perf_counter() - started, 4),
+        "build_seconds": {name: round(seconds, 4) for name, seconds in build_times.items()},
+    }
+    logger.info(f"Startup timings: {app.state.startup_timings}")
+    # Queueing PDF ingests interrupted by the previous run again
+    await run_blocking(pdf_service.resume_interrupted_ingests)
+    # Starting the batch workers, which also resume items left unfinished by the previous run
+    await batch_service.scheduler.start()
+    yield
+    await batch_service.scheduler.stop()
+    pdf_service.shutdown_ingest_workers()
+    shutdown_extract_pool()
 
 # Initialize the FastAPI application
 app = FastAPI(
     title="PDF Q&A API",  # Title of the application
-    description="API for asking questions about PDF documents"  # Description of the application
+    description="API for asking questions about PDF documents",  # Description of the application
+    lifespan=lifespan  # Startup and shutdown hooks
 )
 
+# Full route templates keyed by id() of the route object (routes compare by value, so they are not hashable).
+# Depending on the FastAPI version, the route the router records in the scope is either a copy in app.router
+# with the prefix applied, or the included router's own route, whose path lacks the prefix
+route_templates: Dict[int, str] = {}
+
+def include_router(router: APIRouter, prefix: str, tags: List[str]):
+    app.include_router(router, prefix=prefix, tags=tags)
+    for route in router.routes:
+        route_templates[id(route)] = prefix + getattr(route, "path_format", route.path)
+
+def route_path(request: Request) -> str:
+    # Labelling requests by route template (/pdf/{document_id}/ask) rather than raw path to bound label values;
+    # the router records the matched route in the scope, so this is only valid once the request was handled
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    return route_templates.get(id(route)) or getattr(route, "path_format", None) or route.path
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Timing every request and collecting the spans recorded while serving it
+    trace = start_trace()
+    REQUESTS_IN_PROGRESS.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)  # Returns once the response starts, so streams are timed to first byte
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_PROGRESS.dec()
+        finish_trace(request.method, route_path(request), status, time.perf_counter() - started, trace)
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus scrape endpoint: request and stage latency histograms, cache and token counters
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+@app.get("/metrics/traces")
+async def traces(limit: int = 20, route: str = None):
+    # The slowest recent requests with the time spent in each stage
+    return slowest_traces(limit, route)
+
+@app.get("/health/startup")
+async def startup_timings():
+    # Reporting how long importing, start-up and each client build took
+    return app.state.startup_timings
+
 # Include the router for PDF querying functionality
-app.include_router(
+include_router(
     pdf_service.router,  # The router instance from pdf_service
     prefix="/pdf",  # URL prefix for all routes in this router
     tags=["pdf querying"]  # Tags for categorizing the routes in documentation
 )
 
 # Include the router for MCQ (Multiple Choice Question) generation functionality
-app.include_router(
+include_router(
     questionnaire_service.router,  # The router instance from questionnaire_service
     prefix="/mcq",  # URL prefix for all routes in this router
     tags=["mcq generation"]  # Tags for categorizing the routes in documentation
 )
 
 # Include the router for generating notes from YouTube videos
-app.include_router(
+include_router(
     youtube_service.router,  # The router instance from youtube_service
     prefix="/yt",  # URL prefix for all routes in this router
     tags=["youtube notes"]  # Tags for categorizing the routes in documentation
 )
 
 # Include the router for generating notes from input topics
-app.include_router(
+include_router(
     notes_service.router,  # The router instance from notes_service
     prefix="/note",  # URL prefix for all routes in this router
     tags=["note generation"]  # Tags for categorizing the routes in documentation
 )
 
+# Include the router for bulk notes and MCQ generation
+include_router(
+    batch_service.router,  # The router instance from batch_service
+    prefix="/batch",  # URL prefix for all routes in this router
+    tags=["batch generation"]  # Tags for categorizing the routes in documentation
+)
+
 if __name__ == "__main__":
     import uvicorn
     # Run the FastAPI application with Uvicorn as the ASGI server
@@ -0,0 +1,138 @@
+import contextvars  # Importing contextvars to attach spans to the request being served
+import functools  # Importing functools to bind context in worker threads
+import os  # Importing os module to access environment variables
+import threading  # Importing threading to guard the trace buffer
+import time  # Importing time for span timings
+from collections import deque  # Importing deque for the bounded buffer of recent traces
+from contextlib import contextmanager  # Importing contextmanager to build span timers
+from typing import Callable, Dict, Iterator, List, Optional  # Importing typing helpers for type hinting
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest  # Importing Prometheus metric types
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily  # Importing metric families for the cache collector
+
+# Number of recent requests whose span breakdown is kept for /metrics/traces
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+
+# Buckets from 5 ms to 2 minutes: cache hits and DB queries at the low end, long LLM calls and ingests at the top
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response starts, per route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests currently being served")
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds", "Time spent in each hot-path stage (extraction, embedding, LLM calls, ...)",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter("stage_errors_total", "Stages that raised an exception", ["stage"])
+LLM_TOKENS = Counter("llm_tokens_total", "Prompt and completion tokens sent to and received from LLMs", ["stage", "kind"])
+
+current_trace: contextvars.ContextVar[Optional[List[tuple]]] = contextvars.ContextVar("current_trace", default=None)
+recent_traces: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+recent_traces_lock = threading.Lock()
+
+def observe(stage: str, seconds: float):
+    # Recording a stage timing in the histogram and in the trace of the current request, if any
+    STAGE_LATENCY.labels(stage).observe(seconds)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.append((stage, seconds))
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    # Timing a block of sync or async code: with span("embedding"): ...
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+class TimedIterator:
+    # Wrapping an iterator to total the time spent waiting on it, e.g. pages from the extraction pool
+    # while chunking consumes them; the total is recorded as one observation once it is exhausted
+
+    def __init__(self, stage: str, iterable):
+        self.stage = stage
+        self.elapsed = 0.0
+        self._iterator = iter(iterable)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            observe(self.stage, self.elapsed)
+            raise
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+def record_tokens(stage: str, prompt: str = "", completion: str = ""):
+    # Counting LLM tokens with the shared tokenizer (an estimate for Gemini, which uses its own)
+    from .retrieval import count_tokens  # Importing lazily; retrieval loads tiktoken on first use
+    if prompt:
+        LLM_TOKENS.labels(stage, "prompt").inc(count_tokens(prompt))
+    if completion:
+        LLM_TOKENS.labels(stage, "completion").inc(count_tokens(completion))
+
+def bind_context(func: Callable) -> Callable:
+    # Carrying the current trace into a worker thread; run_in_executor does not copy context variables
+    return functools.partial(contextvars.copy_context().run, func)
+
+def start_trace() -> List[tuple]:
+    trace: List[tuple] = []
+    current_trace.set(trace)
+    return trace
+
+def finish_trace(method: str, route: str, status: int, seconds: float, trace: List[tuple]):
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(seconds)
+    stages: Dict[str, float] = {}
+    for stage, stage_seconds in list(trace):
+        stages[stage] = stages.get(stage, 0.0) + stage_seconds
+    with recent_traces_lock:
+        recent_traces.append({
+            "method": method,
+            "route": route,
+            "status": status,
+            "seconds": round(seconds, 4),
+            "stages": {stage: round(total, 4) for stage, total in stages.items()},
+            "at": time.time(),
+        })
+
+def slowest_traces(limit: int = 20, route: Optional[str] = None) -> List[dict]:
+    # Returning the slowest recent requests with where their time went, for chasing p99 latency
+    with recent_traces_lock:
+        traces = [trace for trace in recent_traces if route is None or trace["route"] == route]
+    return sorted(traces, key=lambda trace: trace["seconds"], reverse=True)[:limit]
+
+cache_stats: Dict[str, Callable[[], dict]] = {}  # Cache name -> stats() of caches exported on /metrics
+
+def register_cache(name: str, stats: Callable[[], dict]):
+    cache_stats[name] = stats
+
+class CacheCollector:
+    # Exporting the counters the caches already keep at scrape time instead of counting twice
+    gauge_fields = ("entries", "memory_items", "disk_bytes")
+
+    def collect(self):
+        events = CounterMetricFamily("cache_events", "Cache lookups by outcome", labels=["cache", "event"])
+        sizes = GaugeMetricFamily("cache_size", "Current size of each cache", labels=["cache", "field"])
+        for name, stats in list(cache_stats.items()):
+            for field, value in stats().items():
+                if field in self.gauge_fields:
+                    sizes.add_metric([name, field], value)
+                elif field != "hit_rate":  # Derived from the counters, so left to the query
+                    events.add_metric([name, field], value)
+        yield events
+        yield sizes
+
+REGISTRY.register(CacheCollector())
+
+def render_metrics() -> tuple:
+    # Returning the Prometheus text exposition and its content type
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
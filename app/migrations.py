@@ -0,0 +1,106 @@
+import ast  # Importing ast to safely parse legacy embeddings that are not valid JSON
+import json  # Importing json to parse legacy text embeddings
+import logging  # Importing logging module to report migration progress
+from sqlalchemy import exists, inspect, or_, select, text, update  # Importing SQLAlchemy helpers for schema inspection and bulk updates
+from sqlalchemy.engine import Engine  # Importing Engine for type hinting
+from .database import Base  # Importing the Base class holding all model metadata
+from .models import PDFFile, PDFEmbedding, pack_embedding, EMBEDDING_DTYPE  # Importing the models and packing helper
+
+logger = logging.getLogger(__name__)  # Creating a logger instance
+
+# Number of legacy rows converted per transaction
+MIGRATION_BATCH_SIZE = 500
+
+def add_missing_columns(engine: Engine):
+    # Adding columns that exist on the models but not yet in the database (create_all never alters tables)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+def sync_indexes(engine: Engine):
+    # Creating model indexes missing from the database and rebuilding ones whose uniqueness changed
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"]: bool(index["unique"]) for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing and existing[index.name] == bool(index.unique):
+                    continue
+                if index.name in existing:
+                    index.drop(conn)
+                index.create(conn)
+                logger.info(f"Created index {index.name}")
+
+def parse_legacy_embedding(value: str) -> list:
+    # str(list_of_floats) is valid JSON in almost every case; literal_eval covers the rest without eval()
+    try:
+        return json.loads(value)
+    except ValueError:
+        return ast.literal_eval(value)
+
+def migrate_embeddings(engine: Engine, dtype: str = EMBEDDING_DTYPE) -> int:
+    # Converting text embeddings into packed binary vectors in batches
+    table = PDFEmbedding.__table__
+    migrated = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, table.c.embedding)
+                .where(table.c.embedding.isnot(None), table.c.vector.is_(None))
+                .limit(MIGRATION_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            for row_id, value in rows:
+                conn.execute(
+                    update(table)
+                    .where(table.c.id == row_id)
+                    .values(vector=pack_embedding(parse_legacy_embedding(value), dtype), dtype=dtype, embedding=None)
+                )
+            migrated += len(rows)
+    if migrated:
+        logger.info(f"Migrated {migrated} text embeddings to packed {dtype} vectors")
+    return migrated
+
+# Error recorded on PDFs that have to be uploaded again before they can answer questions
+REINGEST_ERROR = "Indexed before chunk texts were stored; upload the PDF again"
+
+def backfill_pdf_status(engine: Engine):
+    # PDFs indexed before ingest statuses existed are ready when their chunk texts are stored; older ones
+    # only kept vectors, so their indexes cannot be rebuilt and they have to be ingested again
+    table = PDFFile.__table__
+    embeddings = PDFEmbedding.__table__
+    has_texts = exists().where(embeddings.c.pdf_file_id == table.c.id, embeddings.c.text.isnot(None))
+    with engine.begin() as conn:
+        conn.execute(
+            update(table)
+            .where(or_(table.c.status.is_(None), table.c.status == "ready"), table.c.indexed.is_(True), ~has_texts)
+            .values(indexed=False, status="failed", error=REINGEST_ERROR)
+        )
+        conn.execute(update(table).where(table.c.status.is_(None), table.c.indexed.is_(True)).values(status="ready"))
+        conn.execute(update(table).where(table.c.status.is_(None)).values(status="pending"))
+
+def run_migrations(engine: Engine):
+    # Bringing an existing database up to date with the current models
+    add_missing_columns(engine)
+    sync_indexes(engine)
+    backfill_pdf_status(engine)
+    migrate_embeddings(engine)
+
+if __name__ == "__main__":
+    # Allowing the migration to be run manually with `python -m app.migrations`
+    from .database import engine
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
@@ -1,17 +1,88 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean  # Importing necessary column types and ForeignKey from SQLAlchemy
+import os  # Importing os module to access environment variables
+import numpy as np  # Importing NumPy to pack and unpack embedding vectors
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, LargeBinary, Text, func  # Importing necessary column types and ForeignKey from SQLAlchemy
 from sqlalchemy.orm import relationship  # Importing relationship to define relationships between models
 from .database import Base  # Importing the Base class from the database module
 
+# Storage precision for new embeddings ("float32" or "float16"), configurable through the environment
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+
+# Mapping of supported storage precisions to explicit little-endian NumPy dtypes so blobs are portable
+EMBEDDING_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+
+def pack_embedding(values, dtype: str = EMBEDDING_DTYPE) -> bytes:
+    # Packing the vector into raw little-endian bytes (3 KB for a 768-dim float32 vector)
+    return np.asarray(values, dtype=EMBEDDING_DTYPES[dtype]).tobytes()
+
+def unpack_embedding(blob: bytes, dtype: str = "float32") -> np.ndarray:
+    # Decoding the blob as a read-only view over the stored bytes without copying
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPES[dtype])
+
 class PDFFile(Base):  # Defining a PDFFile model extending the Base class
     __tablename__ = "pdf_files"  # Specifying the table name in the database
     id = Column(Integer, primary_key=True, index=True)  # Defining the primary key column with an index
-    name = Column(String, unique=True, index=True)  # Defining a unique name column with an index
+    name = Column(String, index=True)  # Defining a name column with an index (different files may share a name)
+    content_hash = Column(String(64), unique=True, index=True)  # Defining the SHA-256 digest of the file contents
     indexed = Column(Boolean, default=False)  # Defining a boolean column with a default value of False
-    embeddings = relationship("PDFEmbedding", back_populates="pdf_file")  # Defining a relationship to PDFEmbedding model
+    status = Column(String, default="pending")  # Defining the ingest status: pending, processing, ready or failed
+    error = Column(String, nullable=True)  # Defining the error message of a failed ingest
+    upload_path = Column(String, nullable=True)  # Defining the saved upload awaiting ingest, so an interrupted job can be resumed
+    chunker_version = Column(Integer, nullable=True)  # Defining the chunker version the PDF was indexed with (None before versions existed)
+    embeddings = relationship("PDFEmbedding", back_populates="pdf_file", order_by="PDFEmbedding.id")  # Defining a relationship to PDFEmbedding model, in chunk order
 
 class PDFEmbedding(Base):  # Defining a PDFEmbedding model extending the Base class
     __tablename__ = "pdf_embeddings"  # Specifying the table name in the database
     id = Column(Integer, primary_key=True, index=True)  # Defining the primary key column with an index
-    embedding = Column(String)  # Defining a column to store embeddings as a JSON string
-    pdf_file_id = Column(Integer, ForeignKey("pdf_files.id"))  # Defining a foreign key column referencing the pdf_files table
+    embedding = Column(String, nullable=True)  # Legacy text column (str(list)), emptied by app.migrations
+    vector = Column(LargeBinary)  # Defining a column to store the packed embedding bytes
+    dtype = Column(String, default="float32")  # Defining the precision the vector was packed with
+    text = Column(String)  # Defining the chunk text so any vector store can be rebuilt from the database
+    page_start = Column(Integer, nullable=True)  # Defining the first page (1-based) the chunk covers
+    page_end = Column(Integer, nullable=True)  # Defining the last page the chunk covers
+    char_start = Column(Integer, nullable=True)  # Defining the chunk's start offset within page_start
+    char_end = Column(Integer, nullable=True)  # Defining the chunk's end offset within page_end
+    pdf_file_id = Column(Integer, ForeignKey("pdf_files.id"), index=True)  # Defining an indexed foreign key column referencing the pdf_files table
     pdf_file = relationship("PDFFile", back_populates="embeddings")  # Defining a relationship to the PDFFile model
+
+    def as_array(self) -> np.ndarray:
+        # Returning the stored vector as a zero-copy NumPy array
+        return unpack_embedding(self.vector, self.dtype or "float32")
+
+    def chunk_metadata(self) -> dict:
+        # Returning the chunk's page and offset fields, omitting the ones older rows never recorded
+        fields = {
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "char_start": self.char_start,
+            "char_end": self.char_end,
+        }
+        return {key: value for key, value in fields.items() if value is not None}
+
+class YouTubeTranscript(Base):  # Defining a YouTubeTranscript model caching fetched transcripts
+    __tablename__ = "youtube_transcripts"  # Specifying the table name in the database
+    video_id = Column(String(11), primary_key=True)  # Defining the YouTube video ID as the primary key
+    text = Column(Text, nullable=False)  # Defining the full transcript text
+    fetched_at = Column(DateTime, server_default=func.now())  # Defining when the transcript was fetched
+
+class BatchJob(Base):  # Defining a BatchJob model grouping the items of one bulk generation request
+    __tablename__ = "batch_jobs"  # Specifying the table name in the database
+    id = Column(Integer, primary_key=True, index=True)  # Defining the primary key column with an index
+    created_at = Column(DateTime, server_default=func.now())  # Defining when the batch was submitted
+    items = relationship("BatchJobItem", back_populates="job", order_by="BatchJobItem.id")  # Defining a relationship to the job's items, in submission order
+
+class BatchJobItem(Base):  # Defining a BatchJobItem model for one topic and kind (notes or MCQs) of a batch
+    __tablename__ = "batch_job_items"  # Specifying the table name in the database
+    id = Column(Integer, primary_key=True, index=True)  # Defining the primary key column with an index
+    job_id = Column(Integer, ForeignKey("batch_jobs.id"), index=True)  # Defining an indexed foreign key column referencing the batch_jobs table
+    kind = Column(String, nullable=False)  # Defining what to generate: "notes" or "mcqs"
+    topic = Column(String, nullable=False)  # Defining the topic to generate for
+    num_questions = Column(Integer, nullable=True)  # Defining the number of MCQs requested (MCQ items only)
+    status = Column(String, default="pending", index=True)  # Defining the item status: pending, running, done or failed
+    attempts = Column(Integer, default=0)  # Defining how many times generation was attempted
+    result = Column(Text, nullable=True)  # Defining the generated result as JSON
+    error = Column(String, nullable=True)  # Defining the error message of a failed item
+    finished_at = Column(DateTime, nullable=True)  # Defining when the item finished
+    job = relationship("BatchJob", back_populates="items")  # Defining a relationship to the BatchJob model
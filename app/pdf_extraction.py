@@ -0,0 +1,63 @@
+import multiprocessing  # Importing multiprocessing to start extraction workers with spawn
+import os  # Importing os module to access environment variables and the filesystem
+import shutil  # Importing shutil to copy uploads to disk in blocks
+import tempfile  # Importing tempfile to spool uploads to disk
+import threading  # Importing threading to guard the shared process pool
+from concurrent.futures import ProcessPoolExecutor  # Importing ProcessPoolExecutor to extract pages on several cores
+from typing import BinaryIO, Iterator, List, Optional  # Importing typing helpers for type hinting
+from PyPDF2 import PdfReader  # Importing PdfReader from PyPDF2 for reading PDF files
+
+# Number of processes used for page extraction (1 disables the process pool)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Number of consecutive pages handed to a worker per task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+# Directory for spooled uploads (defaults to the system temp directory)
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
+
+_extract_pool: Optional[ProcessPoolExecutor] = None  # Shared pool, created on first use
+_extract_pool_lock = threading.Lock()
+
+def get_extract_pool(workers: int = PDF_EXTRACT_WORKERS) -> ProcessPoolExecutor:
+    # Starting worker processes once instead of paying the spawn cost on every PDF. Workers are spawned rather
+    # than forked: the server process holds threads (the blocking pool, ingest workers) and open connections
+    # that a forked child would inherit in an arbitrary state
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _extract_pool
+
+def shutdown_extract_pool():
+    # Stopping the worker processes (called on application shutdown)
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(cancel_futures=True)
+            _extract_pool = None
+
+def spool_to_temp_file(file_obj: BinaryIO) -> str:
+    # Copying an upload to a temporary file block by block so it is never held in memory as a whole
+    with tempfile.NamedTemporaryFile(dir=PDF_SPOOL_DIR, suffix=".pdf", delete=False) as out:
+        shutil.copyfileobj(file_obj, out, 1024 * 1024)
+    file_obj.seek(0)  # Reset file pointer for any later reader
+    return out.name
+
+def extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    # Worker task: each process opens the file itself, so only page numbers and text cross process boundaries
+    reader = PdfReader(path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+def iter_page_texts(path: str, workers: int = PDF_EXTRACT_WORKERS, pages_per_task: int = PDF_PAGES_PER_TASK) -> Iterator[str]:
+    # Yielding the text of each page in order, as soon as the task holding it finishes
+    page_count = len(PdfReader(path).pages)
+    if workers <= 1 or page_count <= pages_per_task:
+        yield from extract_page_range(path, 0, page_count)
+        return
+
+    pool = get_extract_pool(workers)
+    futures = [
+        pool.submit(extract_page_range, path, start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+    for future in futures:
+        yield from future.result()
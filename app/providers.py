@@ -0,0 +1,186 @@
+import asyncio  # Importing asyncio for the fakes' simulated latency
+import hashlib  # Importing hashlib to seed deterministic responses
+import json  # Importing json to answer MCQ prompts
+import os  # Importing os module to access environment variables
+import random  # Importing random to generate deterministic filler text
+import re  # Importing re module to recognize MCQ prompts and split responses into tokens
+import time  # Importing time for the fakes' simulated latency in sync code
+from typing import AsyncIterator, List, Optional  # Importing typing helpers for type hinting
+from .registry import registry  # Importing the process-wide client registry
+
+# "google" talks to Gemini, Pinecone and YouTube; "fake" swaps every provider for a deterministic local fake
+# (LLMs, embeddings, the local vector store and transcripts) so benchmarks run offline and reproducibly
+PROVIDER_BACKEND = os.getenv("PROVIDER_BACKEND", "google")
+
+# Fake LLM latency before the first token and per streamed token, and the length of free-text responses
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))
+FAKE_LLM_TOKEN_LATENCY = float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0.002"))
+FAKE_LLM_RESPONSE_WORDS = int(os.getenv("FAKE_LLM_RESPONSE_WORDS", "300"))
+# Fake transcript length and fetch latency
+FAKE_TRANSCRIPT_WORDS = int(os.getenv("FAKE_TRANSCRIPT_WORDS", "3000"))
+FAKE_TRANSCRIPT_LATENCY = float(os.getenv("FAKE_TRANSCRIPT_LATENCY", "0.1"))
+
+# Fields of the MCQ prompt the fake reads to answer with the requested number of questions
+MCQ_TOPIC_PATTERN = re.compile(r"multiple-choice questionnaire on the topic:\s*(.+)")
+MCQ_COUNT_PATTERN = re.compile(r"Number of questions:\s*(\d+)")
+MCQ_PART_PATTERN = re.compile(r"This is part (\d+) of (\d+)")
+PAGE_LABEL_PATTERN = re.compile(r"\[Pages? (\d+)")
+TOKEN_PATTERN = re.compile(r"\S+\s*")
+
+WORDS = (
+    "energy cell structure process system function model theory data analysis result method "
+    "concept example principle property reaction force value rate change level pattern form"
+).split()
+
+def use_fakes() -> bool:
+    return PROVIDER_BACKEND == "fake"
+
+def seeded_random(*parts: str) -> random.Random:
+    # The same inputs always produce the same text, so runs are comparable
+    return random.Random(hashlib.sha256("\x00".join(parts).encode("utf-8")).digest())
+
+class FakeLLM:
+    # Deterministic stand-in for Gemini: MCQ prompts get a JSON array of the requested size,
+    # anything else gets markdown notes; responses arrive after `latency` plus `token_latency` per token
+
+    def __init__(self, latency: float = FAKE_LLM_LATENCY, token_latency: float = FAKE_LLM_TOKEN_LATENCY,
+                 response_words: int = FAKE_LLM_RESPONSE_WORDS):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.response_words = response_words
+        self.calls = 0  # Number of completions requested, for benchmarks
+
+    def respond(self, prompt: str) -> str:
+        if MCQ_COUNT_PATTERN.search(prompt) and MCQ_TOPIC_PATTERN.search(prompt):
+            return self._mcq_response(prompt)
+        return self._notes_response(prompt)
+
+    def _mcq_response(self, prompt: str) -> str:
+        topic = MCQ_TOPIC_PATTERN.search(prompt).group(1).strip()
+        count = int(MCQ_COUNT_PATTERN.search(prompt).group(1))
+        part = MCQ_PART_PATTERN.search(prompt)
+        part = part.group(1) if part else "1"
+        rng = seeded_random(prompt)
+        questions = [
+            {
+                "QuestionNumber": number,
+                "Question": f"{topic}: question {part}.{number}?",
+                "A": rng.choice(WORDS), "B": rng.choice(WORDS), "C": rng.choice(WORDS), "D": rng.choice(WORDS),
+                "CorrectAnswer": rng.choice("ABCD"),
+                "Explanation": " ".join(rng.choice(WORDS) for _ in range(12)),
+            }
+            for number in range(1, count + 1)
+        ]
+        return json.dumps(questions, indent=2)
+
+    def _notes_response(self, prompt: str) -> str:
+        rng = seeded_random(prompt)
+        lines = ["## Introduction"]
+        page = PAGE_LABEL_PATTERN.search(prompt)  # Citing a page like the real model is asked to
+        for i in range(0, self.response_words, 15):
+            lines.append("- " + " ".join(rng.choice(WORDS) for _ in range(min(15, self.response_words - i))))
+            if i and i % 90 == 0:
+                lines.append(f"### Section {i // 90}")
+        if page:
+            lines.append(f"(p. {page.group(1)})")
+        return "\n".join(lines)
+
+    def tokens(self, text: str) -> List[str]:
+        return TOKEN_PATTERN.findall(text)
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        text = self.respond(prompt)
+        time.sleep(self.latency + self.token_latency * len(self.tokens(text)))
+        return text
+
+    async def agenerate(self, prompt: str) -> str:
+        self.calls += 1
+        text = self.respond(prompt)
+        await asyncio.sleep(self.latency + self.token_latency * len(self.tokens(text)))
+        return text
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        text = self.respond(prompt)
+        await asyncio.sleep(self.latency)
+        for token in self.tokens(text):
+            await asyncio.sleep(self.token_latency)
+            yield token
+
+registry.register("fake_llm", FakeLLM)  # Shared by every fake model, so benchmarks can read its call count
+
+def get_fake_llm() -> FakeLLM:
+    return registry.get("fake_llm")
+
+class FakeChunk:
+    # A response or streamed chunk exposing the text the way both LangChain (.content) and Gemini (.text) do
+    def __init__(self, text: str):
+        self.text = text
+        self.content = text
+
+class FakeChatModel:
+    # Stand-in for ChatGoogleGenerativeAI: a prompt string in, message chunks out
+
+    def __init__(self, llm: Optional[FakeLLM] = None):
+        self.llm = llm or get_fake_llm()
+
+    async def ainvoke(self, prompt) -> FakeChunk:
+        return FakeChunk(await self.llm.agenerate(str(prompt)))
+
+    async def astream(self, prompt) -> AsyncIterator[FakeChunk]:
+        async for token in self.llm.astream(str(prompt)):
+            yield FakeChunk(token)
+
+class FakeChain:
+    # Stand-in for a prompt | model chain: formats the template with the inputs and returns text,
+    # or {output_key: text} like LLMChain
+
+    def __init__(self, template: str, output_key: Optional[str] = None, llm: Optional[FakeLLM] = None):
+        self.template = template
+        self.output_key = output_key
+        self.llm = llm or get_fake_llm()
+
+    def _wrap(self, text: str):
+        return {self.output_key: text} if self.output_key else text
+
+    def invoke(self, inputs: dict):
+        return self._wrap(self.llm.generate(self.template.format(**inputs)))
+
+    async def ainvoke(self, inputs: dict):
+        return self._wrap(await self.llm.agenerate(self.template.format(**inputs)))
+
+    async def astream(self, inputs: dict) -> AsyncIterator[str]:
+        async for token in self.llm.astream(self.template.format(**inputs)):
+            yield token
+
+class FakeGenerativeModel:
+    # Stand-in for google.generativeai.GenerativeModel
+
+    def __init__(self, llm: Optional[FakeLLM] = None):
+        self.llm = llm or get_fake_llm()
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if stream:
+            return self._stream(prompt)
+        return FakeChunk(await self.llm.agenerate(prompt))
+
+    async def _stream(self, prompt: str) -> AsyncIterator[FakeChunk]:
+        async for token in self.llm.astream(prompt):
+            yield FakeChunk(token)
+
+class FakeTranscriptApi:
+    # Stand-in for YouTubeTranscriptApi: a deterministic transcript per video ID
+
+    def __init__(self, words: int = FAKE_TRANSCRIPT_WORDS, latency: float = FAKE_TRANSCRIPT_LATENCY):
+        self.words = words
+        self.latency = latency
+
+    def get_transcript(self, video_id: str) -> List[dict]:
+        time.sleep(self.latency)
+        rng = seeded_random(video_id)
+        words = [rng.choice(WORDS) for _ in range(self.words)]
+        return [
+            {"text": " ".join(words[i:i + 12]), "start": i / 2.5, "duration": 4.8}
+            for i in range(0, len(words), 12)
+        ]
@@ -0,0 +1,60 @@
+import logging  # Importing logging module to report build failures and timings
+import threading  # Importing threading to build each entry exactly once
+import time  # Importing time to measure build cost
+from typing import Any, Callable, Dict  # Importing typing helpers for type hinting
+
+logger = logging.getLogger(__name__)  # Creating a logger instance
+
+class Registry:
+    # Process-wide registry of clients, models and chains: each is built once, on first use or at startup
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._eager: Dict[str, bool] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self.build_times: Dict[str, float] = {}  # Seconds spent building each entry
+
+    def register(self, name: str, factory: Callable[[], Any], eager: bool = False):
+        # eager entries are built by warm() at startup; the rest are built on first use
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._eager[name] = eager
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.build_times[name] = time.perf_counter() - start
+            return self._instances[name]
+
+    def override(self, name: str, instance: Any):
+        # Replacing an entry, e.g. with a fake backend in benchmarks
+        with self._registry_lock:
+            self._locks.setdefault(name, threading.Lock())
+            self._instances[name] = instance
+
+    def reset(self):
+        # Dropping every built instance so the next get() rebuilds it
+        with self._registry_lock:
+            self._instances.clear()
+            self.build_times.clear()
+
+    def warm(self) -> Dict[str, float]:
+        # Building every eager entry; a failure is logged and retried lazily on first use
+        for name, eager in list(self._eager.items()):
+            if not eager:
+                continue
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning(f"Could not build {name} at startup: {e}")
+        return dict(self.build_times)
+
+registry = Registry()  # The application's registry
@@ -0,0 +1,135 @@
+import asyncio  # Importing asyncio for single-flight coalescing of identical requests
+import os  # Importing os module to access environment variables
+import re  # Importing re module to normalize inputs
+import time  # Importing time for TTL expiry
+from collections import OrderedDict  # Importing OrderedDict for LRU eviction
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple  # Importing typing helpers for type hinting
+import numpy as np  # Importing NumPy for near-duplicate similarity checks
+from .metrics import register_cache  # Importing the hook exporting cache counters on /metrics
+
+# Seconds a cached response stays valid and how many responses each cache keeps
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+# Cosine similarity above which a different input counts as a near-duplicate (0 disables semantic matching)
+RESPONSE_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0"))
+
+def normalize_input(text: str, case_sensitive: bool = False) -> str:
+    # Case and whitespace differences should not cause a cache miss
+    text = re.sub(r"\s+", " ", text).strip()
+    return text if case_sensitive else text.casefold()
+
+class ResponseCache:
+    # Cache for LLM responses: exact lookup on normalized input + prompt version, optional
+    # near-duplicate lookup through embeddings, TTL and LRU eviction, and single-flight coalescing
+
+    def __init__(self, name: str, prompt_version: str, ttl: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, semantic_threshold: float = 0.0,
+                 case_sensitive: bool = False):
+        self.name = name
+        self.case_sensitive = case_sensitive  # For identifiers such as video IDs
+        self.prompt_version = prompt_version
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Any, Optional[np.ndarray]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.semantic_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        register_cache(name, self.stats)
+
+    async def _embed(self, text: str) -> np.ndarray:
+        from .embeddings import get_embedding_client  # Importing lazily so caches without semantic matching never load it
+        vector = np.asarray(await get_embedding_client().aembed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _lookup(self, key: Tuple[str, str, str]) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]  # Expired
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _semantic_lookup(self, key: Tuple[str, str, str], vector: np.ndarray) -> Optional[Tuple[float, Any, Optional[np.ndarray]]]:
+        # Finding the entry of the most similar cached input with the same prompt version and scope; the entry
+        # itself is returned, so one that expires right after this check is still served once
+        now = time.monotonic()
+        candidates = [
+            (other, entry) for other, entry in self._entries.items()
+            if other[:2] == key[:2] and entry[2] is not None and entry[0] >= now
+        ]
+        if not candidates:
+            return None
+        scores = np.stack([entry[2] for _, entry in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.semantic_threshold:
+            return None
+        similar, entry = candidates[best]
+        self._entries.move_to_end(similar)
+        return entry
+
+    def _store(self, key: Tuple[str, str, str], value: Any, vector: Optional[np.ndarray]):
+        self._entries[key] = (time.monotonic() + self.ttl, value, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, text: str, compute: Callable[[], Awaitable[Any]], scope: str = "") -> Any:
+        # text is the free-form input (e.g. a topic); scope holds the other parameters that must match exactly
+        key = (self.prompt_version, normalize_input(scope), normalize_input(text, self.case_sensitive))
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        if key in self._inflight:
+            # An identical request is already calling upstream; sharing its result
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+
+        vector = None
+        if self.semantic_threshold > 0:
+            vector = await self._embed(key[2])
+            entry = self._semantic_lookup(key, vector)
+            if entry is not None:
+                self.semantic_hits += 1
+                return entry[1]
+            if key in self._inflight:  # Started while we were embedding
+                self.coalesced += 1
+                return await asyncio.shield(self._inflight[key])
+
+        self.misses += 1
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+            self._store(key, value, vector)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def peek(self, text: str, scope: str = "") -> Optional[Any]:
+        # Exact-match lookup without computing anything (used by streaming endpoints)
+        entry = self._lookup((self.prompt_version, normalize_input(scope), normalize_input(text, self.case_sensitive)))
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, text: str, value: Any, scope: str = ""):
+        # Storing a response produced outside get_or_compute, e.g. the full text of a finished stream
+        self._store((self.prompt_version, normalize_input(scope), normalize_input(text, self.case_sensitive)), value, None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,76 @@
+import os  # Importing os module to access environment variables
+from typing import Dict, List  # Importing typing helpers for type hinting
+
+# Candidates taken from each retriever before fusion
+DENSE_TOP_K = int(os.getenv("DENSE_TOP_K", "10"))
+BM25_TOP_K = int(os.getenv("BM25_TOP_K", "10"))
+# Reciprocal rank fusion constant; larger values flatten the difference between ranks
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Maximum number of tokens of retrieved context placed in the prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+
+_encoding = None  # tiktoken encoding, loaded on first use
+
+def count_tokens(text: str) -> int:
+    # Counting tokens with tiktoken when it is installed, otherwise estimating four characters per token
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken  # Importing lazily; the estimate is close enough when it is missing
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+def fuse_rankings(rankings: List[List[dict]], k: int = RRF_K) -> List[dict]:
+    # Reciprocal rank fusion: a chunk ranked highly by either retriever rises to the top
+    fused: Dict[str, dict] = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            entry = fused.setdefault(match["id"], {**match, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda match: match["score"], reverse=True)
+
+def format_page_span(metadata: dict) -> str:
+    # Rendering "Page 3" or "Pages 3-4" for a chunk's citation label
+    start, end = metadata.get("page_start"), metadata.get("page_end")
+    if start is None:
+        return ""
+    if end is None or end == start:
+        return f"Page {start}"
+    return f"Pages {start}-{end}"
+
+def cited_pages(matches: List[dict]) -> List[int]:
+    # Listing the pages covered by the chunks placed in the prompt, in page order
+    pages = set()
+    for match in matches:
+        metadata = match.get("metadata") or {}
+        if metadata.get("page_start") is not None:
+            pages.update(range(metadata["page_start"], (metadata.get("page_end") or metadata["page_start"]) + 1))
+    return sorted(pages)
+
+def select_context(matches: List[dict], budget: int = CONTEXT_TOKEN_BUDGET) -> List[dict]:
+    # Taking chunks in rank order until the token budget is spent; the last one is trimmed to fit
+    selected = []
+    used = 0
+    for match in matches:
+        tokens = count_tokens(match["text"])
+        if used + tokens <= budget:
+            selected.append(match)
+            used += tokens
+            continue
+        remaining = budget - used
+        if remaining > 50:  # Skipping slivers too short to be useful
+            selected.append({**match, "text": match["text"][:remaining * 4]})
+        break
+    return selected
+
+def format_context(selected: List[dict]) -> str:
+    # Labelling each chunk with its pages so the answer can cite them
+    parts = []
+    for match in selected:
+        label = format_page_span(match.get("metadata") or {})
+        parts.append(f"[{label}]\n{match['text']}" if label else match["text"])
+    return "\n\n".join(parts)
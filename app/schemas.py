@@ -1,5 +1,9 @@
-from pydantic import BaseModel, HttpUrl  # Importing BaseModel and HttpUrl from pydantic library for data validation
+from pydantic import BaseModel, Field, HttpUrl  # Importing BaseModel, Field and HttpUrl from pydantic library for data validation
 from typing import List, Optional  # Importing List and Optional from typing module for type hinting
+import os  # Importing os module to read request limits from environment variables
+
+# Largest number of MCQs one request (or one batch topic) may ask for; every MCQ_BATCH_SIZE questions cost an LLM call
+MCQ_MAX_QUESTIONS = int(os.getenv("MCQ_MAX_QUESTIONS", "50"))
 
 class MCQQuestion(BaseModel):  # Defining a Pydantic model for multiple choice questions
     QuestionNumber: int  # An integer representing the question number
@@ -13,7 +17,7 @@ class MCQQuestion(BaseModel):  # Defining a Pydantic model for multiple choice q
 
 class MCQRequest(BaseModel):  # Defining a Pydantic model for MCQ request data
     topic: str  # A string specifying the topic of the questions
-    num_questions: Optional[int] = 10  # An optional integer specifying the number of questions, default is 10
+    num_questions: int = Field(10, ge=1, le=MCQ_MAX_QUESTIONS)  # An integer from 1 to MCQ_MAX_QUESTIONS specifying the number of questions, default is 10
 
 class MCQResponse(BaseModel):  # Defining a Pydantic model for MCQ response data
     questions: List[MCQQuestion]  # A list of MCQQuestion objects
@@ -36,3 +40,34 @@ class NoteRequest(BaseModel):  # Defining a Pydantic model for note request data
 class NoteResponse(BaseModel):  # Defining a Pydantic model for note response data
     topic: str  # A string specifying the topic of the notes
     content: str  # A string containing the content of the notes
+
+class PDFUploadResponse(BaseModel):  # Defining a Pydantic model for PDF upload response data
+    document_id: int  # An integer identifying the uploaded document
+    status: str  # A string with the ingest status (pending, processing, ready or failed)
+
+class PDFStatusResponse(BaseModel):  # Defining a Pydantic model for PDF ingest status data
+    document_id: int  # An integer identifying the document
+    name: str  # A string containing the uploaded filename
+    status: str  # A string with the ingest status (pending, processing, ready or failed)
+    error: Optional[str] = None  # An optional string describing why the ingest failed
+
+class PDFQuestionRequest(BaseModel):  # Defining a Pydantic model for PDF question request data
+    question: str  # A string containing the question about the document
+
+class PDFAnswerResponse(BaseModel):  # Defining a Pydantic model for PDF answer response data
+    response: str  # A string containing the generated answer
+    pages: List[int] = []  # Pages of the chunks the answer was generated from
+
+class BatchRequest(BaseModel):  # Defining a Pydantic model for bulk notes and MCQ generation requests
+    topics: List[str]  # A list of topics, e.g. a whole syllabus
+    notes: bool = True  # Whether to generate notes for each topic
+    mcqs: bool = True  # Whether to generate MCQs for each topic
+    num_questions: int = Field(10, ge=1, le=MCQ_MAX_QUESTIONS)  # An integer from 1 to MCQ_MAX_QUESTIONS specifying the number of MCQs per topic
+
+class BatchJobResponse(BaseModel):  # Defining a Pydantic model for batch job progress data
+    job_id: int  # An integer identifying the batch job
+    total: int  # The number of items (topic and kind pairs) in the job
+    pending: int  # Items waiting for a worker
+    running: int  # Items being generated
+    done: int  # Items generated successfully
+    failed: int  # Items that failed after all attempts
@@ -0,0 +1,285 @@
+import asyncio  # Importing asyncio for the batch worker queue
+import json  # Importing json to store results and stream them as NDJSON
+import logging  # Importing logging module to report failed items
+import os  # Importing os module to access environment variables
+from typing import Dict, List, Optional, Set, Tuple  # Importing typing helpers for type hinting
+from fastapi import APIRouter, HTTPException  # Importing FastAPI components for routing and exception handling
+from fastapi.responses import StreamingResponse  # Importing StreamingResponse to stream results as they complete
+from sqlalchemy import func, update  # Importing func to count items per status and update for atomic claims
+from ..concurrency import RateLimiter, run_blocking  # Importing the provider rate limiter and the blocking pool
+from ..database import SessionLocal  # Importing SessionLocal for the job tables
+from ..embeddings import is_rate_limit_error  # Importing the provider rate-limit check
+from ..models import BatchJob, BatchJobItem  # Importing the batch job models
+from ..schemas import BatchRequest, BatchJobResponse  # Importing request and response schemas
+from . import notes_service, questionnaire_service  # Importing the generators the batch items run
+
+router = APIRouter()  # Creating a new FastAPI router instance
+logger = logging.getLogger(__name__)  # Creating a logger instance
+
+# Batch items generated at once, and LLM calls per minute allowed across all of them (0 disables the limit)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_RATE_LIMIT = float(os.getenv("BATCH_RATE_LIMIT", "60"))
+# Attempts per item, and how long the queue pauses after the provider reports a rate limit
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+BATCH_RATE_LIMIT_BACKOFF = float(os.getenv("BATCH_RATE_LIMIT_BACKOFF", "30"))
+BATCH_MAX_TOPICS = int(os.getenv("BATCH_MAX_TOPICS", "1000"))
+RESULT_WAIT_SECONDS = 30  # Longest a result stream waits before re-checking the job table
+
+FINISHED_STATUSES = ("done", "failed")
+
+def create_job(topics: List[str], notes: bool, mcqs: bool, num_questions: int) -> int:
+    # Recording the job and one item per topic and kind, in the order they should run
+    db = SessionLocal()
+    try:
+        job = BatchJob()
+        db.add(job)
+        db.flush()
+        kinds = [kind for kind, wanted in (("notes", notes), ("mcqs", mcqs)) if wanted]
+        db.add_all([
+            BatchJobItem(
+                job_id=job.id, kind=kind, topic=topic, status="pending",
+                num_questions=num_questions if kind == "mcqs" else None
+            )
+            for topic in topics for kind in kinds
+        ])
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+def pending_item_ids(job_id: Optional[int] = None) -> List[int]:
+    db = SessionLocal()
+    try:
+        query = db.query(BatchJobItem.id).filter(BatchJobItem.status == "pending")
+        if job_id is not None:
+            query = query.filter(BatchJobItem.job_id == job_id)
+        return [item_id for item_id, in query.order_by(BatchJobItem.id)]
+    finally:
+        db.close()
+
+def reset_interrupted_items() -> List[int]:
+    # Items left running by a restart are queued again, followed by the ones that never started
+    db = SessionLocal()
+    try:
+        db.query(BatchJobItem).filter(BatchJobItem.status == "running").update({"status": "pending"})
+        db.commit()
+    finally:
+        db.close()
+    return pending_item_ids()
+
+def claim_item(item_id: int) -> Optional[Tuple[str, str, Optional[int], int]]:
+    # Marking a pending item as running; returns (kind, topic, num_questions, attempts) or None if it was taken.
+    # The check and the write are one conditional UPDATE, so an item queued twice, or resumed by several
+    # processes, is claimed by exactly one worker
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(BatchJobItem)
+            .where(BatchJobItem.id == item_id, BatchJobItem.status == "pending")
+            .values(status="running", attempts=func.coalesce(BatchJobItem.attempts, 0) + 1)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return None
+        item = db.get(BatchJobItem, item_id)
+        return item.kind, item.topic, item.num_questions, item.attempts
+    finally:
+        db.close()
+
+def finish_item(item_id: int, status: str, result: Optional[str] = None, error: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        item = db.get(BatchJobItem, item_id)
+        item.status = status
+        item.result = result
+        item.error = error
+        item.finished_at = func.now() if status in FINISHED_STATUSES else None  # The database clock, like BatchJob.created_at
+        db.commit()
+    finally:
+        db.close()
+
+def job_progress(job_id: int) -> Optional[Dict[str, int]]:
+    # Counting the job's items per status in one grouped query
+    db = SessionLocal()
+    try:
+        if db.get(BatchJob, job_id) is None:
+            return None
+        counts = dict(
+            db.query(BatchJobItem.status, func.count(BatchJobItem.id))
+            .filter(BatchJobItem.job_id == job_id)
+            .group_by(BatchJobItem.status)
+            .all()
+        )
+        progress = {status: counts.get(status, 0) for status in ("pending", "running", "done", "failed")}
+        return {"job_id": job_id, "total": sum(counts.values()), **progress}
+    finally:
+        db.close()
+
+def finished_item_ids(job_id: int) -> Set[int]:
+    db = SessionLocal()
+    try:
+        rows = db.query(BatchJobItem.id).filter(
+            BatchJobItem.job_id == job_id, BatchJobItem.status.in_(FINISHED_STATUSES)
+        )
+        return {item_id for item_id, in rows}
+    finally:
+        db.close()
+
+def load_results(item_ids: List[int]) -> List[dict]:
+    db = SessionLocal()
+    try:
+        items = db.query(BatchJobItem).filter(BatchJobItem.id.in_(item_ids)).order_by(BatchJobItem.id)
+        return [
+            {
+                "item_id": item.id,
+                "kind": item.kind,
+                "topic": item.topic,
+                "status": item.status,
+                "result": json.loads(item.result) if item.result else None,
+                "error": item.error,
+            }
+            for item in items
+        ]
+    finally:
+        db.close()
+
+async def generate_item(kind: str, topic: str, num_questions: Optional[int], limiter: RateLimiter) -> dict:
+    # Generating through the same caches as the single-topic endpoints; cached topics use no quota, and
+    # each LLM call is charged to the limiter as it is made
+    if kind == "notes":
+        cache = notes_service.notes_cache
+        content = cache.peek(topic)
+        if content is None:
+            await limiter.acquire()
+            content = await cache.get_or_compute(topic, lambda: notes_service.agenerate_notes(topic))
+        return {"topic": topic, "content": content}
+
+    cache = questionnaire_service.mcq_cache
+    scope = str(num_questions)
+    questions = cache.peek(topic, scope=scope)
+    if questions is None:
+        questions = await cache.get_or_compute(
+            topic,
+            lambda: questionnaire_service.generate_mcqs(topic, num_questions, limiter),
+            scope=scope
+        )
+    return {"questions": [question.model_dump() for question in questions]}
+
+class BatchScheduler:
+    # Worker queue shared by all batch jobs: items run in submission order, `concurrency` at a time,
+    # within the provider rate limit; the job table is the source of truth, so a restart resumes where it stopped
+
+    def __init__(self, concurrency: int = BATCH_CONCURRENCY, limiter: Optional[RateLimiter] = None):
+        self.concurrency = concurrency
+        self.limiter = limiter or RateLimiter(BATCH_RATE_LIMIT)
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.completed = 0  # Items finished since start; result streams wait for it to change
+        self.finished: Optional[asyncio.Condition] = None
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.finished = asyncio.Condition()
+        self.workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        resumed = await run_blocking(reset_interrupted_items)
+        if resumed:
+            logger.info(f"Resuming {len(resumed)} pending batch items")
+        self.submit(resumed)
+
+    async def stop(self):
+        # Items interrupted here stay "running" in the table and are queued again on the next start
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, item_ids: List[int]):
+        if self.queue is None:
+            raise RuntimeError("The batch scheduler has not been started")
+        for item_id in item_ids:
+            self.queue.put_nowait(item_id)
+
+    async def _work(self):
+        while True:
+            item_id = await self.queue.get()
+            try:
+                await self._run(item_id)
+            except Exception:
+                logger.exception(f"Batch item {item_id} could not be processed")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, item_id: int):
+        claimed = await run_blocking(claim_item, item_id)
+        if claimed is None:
+            return  # Already finished, or queued twice
+        kind, topic, num_questions, attempts = claimed
+        try:
+            result = await generate_item(kind, topic, num_questions, self.limiter)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.limiter.pause(BATCH_RATE_LIMIT_BACKOFF * attempts)  # Slowing every worker down, not just this one
+            if attempts < BATCH_MAX_ATTEMPTS:
+                logger.warning(f"Batch item {item_id} failed (attempt {attempts}), retrying: {e}")
+                await run_blocking(finish_item, item_id, "pending")
+                self.queue.put_nowait(item_id)  # Retrying after the items already queued
+                return
+            logger.error(f"Batch item {item_id} failed after {attempts} attempts: {e}")
+            await run_blocking(finish_item, item_id, "failed", error=str(e))
+        else:
+            await run_blocking(finish_item, item_id, "done", result=json.dumps(result))
+        async with self.finished:
+            self.completed += 1
+            self.finished.notify_all()
+
+    async def wait_for_completion(self, seen: int, timeout: float = RESULT_WAIT_SECONDS):
+        # Waiting until an item finishes after `seen` completions were counted, or the timeout passes
+        async with self.finished:
+            try:
+                await asyncio.wait_for(self.finished.wait_for(lambda: self.completed != seen), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+scheduler = BatchScheduler()  # Started and stopped by the application lifespan
+
+async def stream_results(job_id: int):
+    # Yielding one NDJSON line per item as items finish, starting with those already finished
+    sent: Set[int] = set()
+    while True:
+        seen = scheduler.completed
+        progress = await run_blocking(job_progress, job_id)
+        new_ids = await run_blocking(finished_item_ids, job_id) - sent
+        if new_ids:
+            for result in await run_blocking(load_results, sorted(new_ids)):
+                yield json.dumps(result) + "\n"
+            sent |= new_ids
+        if len(sent) >= progress["total"]:
+            return
+        await scheduler.wait_for_completion(seen)
+
+@router.post("/", response_model=BatchJobResponse)
+async def create_batch(request: BatchRequest):
+    topics = [topic.strip() for topic in request.topics if topic.strip()]
+    if not topics:
+        raise HTTPException(status_code=400, detail="No topics given")
+    if len(topics) > BATCH_MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TOPICS} topics per batch")
+    if not (request.notes or request.mcqs):
+        raise HTTPException(status_code=400, detail="Nothing to generate: enable notes or mcqs")
+    job_id = await run_blocking(create_job, topics, request.notes, request.mcqs, request.num_questions)
+    scheduler.submit(await run_blocking(pending_item_ids, job_id))
+    return BatchJobResponse(**await run_blocking(job_progress, job_id))
+
+@router.get("/{job_id}", response_model=BatchJobResponse)
+async def get_batch(job_id: int):
+    progress = await run_blocking(job_progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return BatchJobResponse(**progress)
+
+@router.get("/{job_id}/results")
+async def get_batch_results(job_id: int):
+    # Streaming results as newline-delimited JSON; reconnecting replays finished items, then continues
+    if await run_blocking(job_progress, job_id) is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return StreamingResponse(stream_results(job_id), media_type="application/x-ndjson")
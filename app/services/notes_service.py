@@ -1,15 +1,18 @@
 from fastapi import APIRouter, HTTPException  # Importing APIRouter and HTTPException from FastAPI for routing and error handling
-from langchain.prompts import PromptTemplate  # Importing PromptTemplate from LangChain for generating prompts
-from langchain_google_genai import ChatGoogleGenerativeAI  # Importing ChatGoogleGenerativeAI for generating AI-based responses
-from langchain.schema.runnable import RunnableSequence  # Importing RunnableSequence to create a sequence of operations
-from langchain.schema import StrOutputParser  # Importing StrOutputParser to parse the string output
+from ..metrics import record_tokens, span  # Importing the stage timer and token counter
+from ..providers import FakeChain, use_fakes  # Importing the offline provider fakes
+from ..registry import registry  # Importing the process-wide client registry
+from ..response_cache import ResponseCache, RESPONSE_CACHE_SEMANTIC_THRESHOLD  # Importing the shared response cache
+from ..streaming import sse_response, stream_cached  # Importing the server-sent events helpers
 from ..schemas import NoteRequest, NoteResponse  # Importing NoteRequest and NoteResponse schemas from the parent directory
 
 router = APIRouter()  # Creating a new FastAPI router instance
 
-def get_notes_generation_chain():
-    # Defining the prompt template for generating notes
-    prompt_template = """
+NOTES_PROMPT_VERSION = "1"  # Bump whenever the prompt changes so cached notes are not reused
+notes_cache = ResponseCache("notes", NOTES_PROMPT_VERSION, semantic_threshold=RESPONSE_CACHE_SEMANTIC_THRESHOLD)  # Cache of generated notes per topic
+
+# Prompt for generating notes on a topic
+NOTES_PROMPT_TEMPLATE = """
     Generate detailed notes on the given topic. Use headings, subheadings, and bullet points to organize the information.
     Make sure to cover key concepts, important details, and any relevant examples or applications.
 
@@ -25,10 +28,20 @@ def get_notes_generation_chain():
     Notes:
     """
 
+def build_notes_generation_chain():
+    if use_fakes():
+        return FakeChain(NOTES_PROMPT_TEMPLATE)  # Returns and streams plain text like the StrOutputParser chain
+
+    # Importing LangChain lazily so the import cost is paid when the chain is built, not when the app loads
+    from langchain.prompts import PromptTemplate
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain.schema.runnable import RunnableSequence
+    from langchain.schema import StrOutputParser
+
     # Initializing the Google Generative AI model with specific parameters
     model = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", temperature=0.3)
     # Creating a PromptTemplate with the defined template and input variable
-    prompt = PromptTemplate(template=prompt_template, input_variables=["topic"])
+    prompt = PromptTemplate(template=NOTES_PROMPT_TEMPLATE, input_variables=["topic"])
     
     # Creating a RunnableSequence with the prompt, model, and output parser
     chain = RunnableSequence(
@@ -36,15 +49,48 @@ def get_notes_generation_chain():
     )
     return chain  # Returning the created chain
 
-def generate_notes(topic: str) -> str:
+registry.register("notes_chain", build_notes_generation_chain, eager=True)  # Building the chain once, at startup
+
+def get_notes_generation_chain():
+    return registry.get("notes_chain")  # Reusing the chain built for the process
+
+async def agenerate_notes(topic: str) -> str:
     chain = get_notes_generation_chain()  # Getting the notes generation chain
-    return chain.invoke({"topic": topic})  # Invoking the chain with the provided topic and returning the generated notes
+    with span("llm.notes"):
+        notes = await chain.ainvoke({"topic": topic})  # Invoking the chain without blocking the event loop
+    record_tokens("llm.notes", completion=notes)
+    return notes
 
 @router.post("/generate_notes/", response_model=NoteResponse)  # Defining a POST endpoint for generating notes
 async def create_notes(note_request: NoteRequest):
     try:
-        notes_content = generate_notes(note_request.topic)  # Generating notes for the requested topic
+        # Generating notes for the requested topic, or reusing notes already generated for it
+        notes_content = await notes_cache.get_or_compute(
+            note_request.topic,
+            lambda: agenerate_notes(note_request.topic)
+        )
         return NoteResponse(topic=note_request.topic, content=notes_content)  # Returning the notes response
     except Exception as e:
         # Raising an HTTP exception in case of an error
         raise HTTPException(status_code=500, detail=f"Failed to generate notes: {str(e)}")
+
+async def stream_notes(topic: str):
+    # Yielding the notes token by token as the chain produces them
+    chain = get_notes_generation_chain()  # Getting the notes generation chain
+    tokens = []
+    with span("llm.notes_stream"):
+        async for token in chain.astream({"topic": topic}):
+            tokens.append(token)
+            yield token
+    record_tokens("llm.notes", completion="".join(tokens))
+
+@router.post("/generate_notes/stream")  # Defining a POST endpoint streaming notes as server-sent events
+async def create_notes_stream(note_request: NoteRequest):
+    cached = notes_cache.peek(note_request.topic)
+    if cached is not None:
+        return sse_response(stream_cached(cached))
+
+    async def remember(content: str):
+        notes_cache.put(note_request.topic, content)  # Letting later JSON and streaming requests reuse the notes
+
+    return sse_response(stream_notes(note_request.topic), on_complete=remember)
@@ -1,25 +1,52 @@
-import io  # Importing io module for file handling
-from typing import List  # Importing List from typing module for type hinting
+import hashlib  # Importing hashlib to fingerprint uploaded files
+import logging  # Importing logging module to report failed ingest jobs
+import os  # Importing os module to access environment variables and the filesystem
+import tempfile  # Importing tempfile to stream uploads to disk
+import threading  # Importing threading to track running ingest jobs
+import time  # Importing time to separate extraction from chunking time
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor for the background ingest workers
+from typing import List, Set, Tuple  # Importing typing helpers for type hinting
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile  # Importing FastAPI components for routing, dependencies, file uploads, and exception handling
-from sqlalchemy.orm import Session  # Importing Session for database operations
-from PyPDF2 import PdfReader  # Importing PdfReader from PyPDF2 for reading PDF files
-from langchain.text_splitter import RecursiveCharacterTextSplitter  # Importing RecursiveCharacterTextSplitter for splitting text
-from langchain_google_genai import GoogleGenerativeAIEmbeddings  # Importing GoogleGenerativeAIEmbeddings for generating embeddings
-from langchain.prompts import PromptTemplate  # Importing PromptTemplate for creating prompt templates
-from langchain.chains import LLMChain  # Importing LLMChain for creating language model chains
-from langchain_google_genai import ChatGoogleGenerativeAI  # Importing ChatGoogleGenerativeAI for chat model
-import os  # Importing os module to access environment variables
-from pinecone import Pinecone  # Importing Pinecone for vector database
+from sqlalchemy import insert  # Importing insert for bulk embedding inserts
+from sqlalchemy.exc import IntegrityError  # Importing IntegrityError to detect concurrent uploads of the same contents
+from sqlalchemy.orm import Session, selectinload  # Importing Session for database operations and selectinload for eager loading
 from dotenv import load_dotenv  # Importing dotenv to load environment variables from a .env file
-from ..database import SessionLocal  # Importing SessionLocal for database session
-from ..models import PDFFile, PDFEmbedding  # Importing PDFFile and PDFEmbedding models
+from ..bm25 import get_bm25_store  # Importing the per-document keyword index
+from ..chunking import CHUNKER_VERSION, Chunk, chunk_pages  # Importing the page- and heading-aware chunker
+from ..concurrency import run_blocking  # Importing the bounded thread pool for blocking calls
+from ..embeddings import get_embedding_client  # Importing the shared batching embedding client
+from ..metrics import TimedIterator, observe, record_tokens, span  # Importing stage timers and the token counter
+from ..database import SessionLocal, AsyncSessionLocal  # Importing the sync and optional async session classes
+from ..models import PDFFile, PDFEmbedding, pack_embedding, EMBEDDING_DTYPE  # Importing models and the embedding packing helper
+from ..pdf_extraction import iter_page_texts, spool_to_temp_file  # Importing the parallel page extraction engine
+from ..providers import FakeChain, use_fakes  # Importing the offline provider fakes
+from ..registry import registry  # Importing the process-wide client registry
+from ..retrieval import DENSE_TOP_K, BM25_TOP_K, cited_pages, format_context, fuse_rankings, select_context  # Importing hybrid retrieval helpers
+from ..schemas import PDFUploadResponse, PDFStatusResponse, PDFQuestionRequest, PDFAnswerResponse  # Importing request and response schemas
+from ..vector_store import VectorStore, get_vector_store  # Importing the pluggable vector store interface
 
 router = APIRouter()  # Creating a new FastAPI router instance
+logger = logging.getLogger(__name__)  # Creating a logger instance
+
+HASH_BLOCK_SIZE = 1024 * 1024  # Reading uploads in 1 MiB blocks while hashing
 
 load_dotenv()  # Loading environment variables from a .env file
 
-# Initialize Pinecone
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))  # Initializing Pinecone with API key from environment variable
+# Directory holding uploaded PDFs until their ingest job has finished
+UPLOAD_DIR = os.getenv("PDF_UPLOAD_DIR", "./uploads")
+# Number of PDFs ingested concurrently in the background
+INGEST_WORKERS = int(os.getenv("PDF_INGEST_WORKERS", "2"))
+
+ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="pdf-ingest")  # Background ingest worker pool
+active_jobs = set()  # IDs of documents with an ingest job queued or running in this process
+active_jobs_lock = threading.Lock()
+
+# Error recorded on documents whose ingest was interrupted and whose upload is gone
+INTERRUPTED_ERROR = "Ingest was interrupted; upload the PDF again"
+
+def shutdown_ingest_workers():
+    # Stopping the ingest pool on application shutdown; interrupted jobs are resumed at the next start
+    ingest_executor.shutdown(wait=False, cancel_futures=True)
 
 def get_db():
     db = SessionLocal()  # Creating a new database session
@@ -28,145 +55,398 @@ def get_db():
     finally:
         db.close()  # Closing the session when done
 
-def extract_text_from_pdf(pdf_file: UploadFile) -> str:
-    # Checking if the uploaded file is empty
-    if pdf_file.file.read(1) == b'':
-        raise ValueError("The uploaded file is empty")
-    
-    pdf_file.file.seek(0)  # Reset file pointer to the beginning
-    pdf_bytes = io.BytesIO(pdf_file.file.read())  # Reading the file into a BytesIO stream
-    pdf_reader = PdfReader(pdf_bytes)  # Creating a PdfReader object
-    
-    text = ""
-    # Extracting text from each page of the PDF
-    for page in pdf_reader.pages:
-        text += page.extract_text() + "\n"
-    
-    # Raising an error if no text could be extracted
-    if not text.strip():
+def compute_content_hash(file_obj) -> str:
+    # Computing the SHA-256 digest block by block so the file is never held in memory twice
+    digest = hashlib.sha256()
+    for block in iter(lambda: file_obj.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    file_obj.seek(0)  # Reset file pointer so the PDF can still be parsed
+    return digest.hexdigest()
+
+def generate_embeddings(text_chunks: List[str]) -> List[List[float]]:
+    # Generating embeddings in batches through the shared client
+    return get_embedding_client().embed_documents(text_chunks)
+
+def store_embeddings(db: Session, pdf_file_id: int, chunks: List[Chunk], embeddings: List[List[float]]):
+    # Storing the embeddings with their chunk texts and pages as one executemany insert instead of one ORM object per row;
+    # rows left by an earlier failed or interrupted attempt are replaced, and the caller commits
+    db.query(PDFEmbedding).filter(PDFEmbedding.pdf_file_id == pdf_file_id).delete(synchronize_session=False)
+    rows = [
+        {
+            "pdf_file_id": pdf_file_id,
+            "vector": pack_embedding(embedding),
+            "dtype": EMBEDDING_DTYPE,
+            "text": chunk.text,
+            **chunk.metadata(),
+        }
+        for chunk, embedding in zip(chunks, embeddings)
+    ]
+    if rows:
+        db.execute(insert(PDFEmbedding), rows)
+
+def get_document_id(pdf_record: PDFFile) -> str:
+    # Key under which a PDF's vectors are stored in the vector store
+    return f"pdf-{pdf_record.id}"
+
+def index_pdf(db: Session, pdf_record: PDFFile, path: str):
+    # Splitting the text into token-sized chunks along paragraphs and headings while pages are extracted in parallel
+    started = time.perf_counter()
+    pages = TimedIterator("pdf.extract", iter_page_texts(path))  # Time spent waiting on the extraction pool
+    chunks = list(chunk_pages(pages))
+    observe("pdf.chunk", time.perf_counter() - started - pages.elapsed)
+    if not chunks:
         raise ValueError("No text could be extracted from the PDF")
-    
-    return text  # Returning the extracted text
+    text_chunks = [chunk.text for chunk in chunks]
+    metadata = [chunk.metadata() for chunk in chunks]
+    with span("pdf.embed"):
+        embeddings = generate_embeddings(text_chunks)  # Generating embeddings for the text chunks
 
-def get_text_chunks(text: str) -> List[str]:
-    # Creating a text splitter with specified chunk size and overlap
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=10000,
-        chunk_overlap=1000
-    )
-    return text_splitter.split_text(text)  # Splitting the text into chunks
+    # Writing the indexes before the document is marked ready, so no question can trigger a rebuild while they are written
+    with span("vector.upsert"):
+        get_vector_store().add(get_document_id(pdf_record), text_chunks, embeddings, metadata)  # Adding the vectors to the vector store
+    with span("bm25.index"):
+        get_bm25_store().add(get_document_id(pdf_record), text_chunks, metadata)  # Building the keyword index alongside the vectors
 
-def generate_embeddings(text_chunks: List[str]) -> List[List[float]]:
-    # Initializing the embeddings model
-    embeddings_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    # Generating embeddings for each text chunk
-    return [embeddings_model.embed_query(chunk) for chunk in text_chunks]
-
-def store_embeddings(db: Session, pdf_file_id: int, embeddings: List[List[float]]):
-    # Storing each embedding in the database
-    for embedding in embeddings:
-        pdf_embedding = PDFEmbedding(pdf_file_id=pdf_file_id, embedding=str(embedding))
-        db.add(pdf_embedding)
-    db.commit()  # Committing the transaction to save embeddings
-
-def get_vector_store(text_chunks: List[str], embeddings: List[List[float]]):
-    index_name = "pdf-chatbot"  # Specifying the index name for Pinecone
-    
-    # Checking if the index already exists
-    if index_name not in pc.list_indexes().names():
-        # Creating a new index if it does not exist
-        pc.create_index(
-            name=index_name, 
-            dimension=768,  # Adjust this based on your embedding dimension
-            metric='cosine'
+    store_embeddings(db, pdf_record.id, chunks, embeddings)  # Storing the embeddings in the database
+    pdf_record.indexed = True  # Marking the PDF as indexed
+    pdf_record.status = "ready"  # Marking the PDF as ready for questions
+    pdf_record.error = None
+    pdf_record.chunker_version = CHUNKER_VERSION  # Recording the chunking so older documents can be re-indexed
+    pdf_record.upload_path = None  # The upload is removed once it has been ingested
+    db.commit()  # Committing the embeddings together with the ready status
+
+def index_uploaded_pdf(db: Session, pdf_record: PDFFile, pdf_file: UploadFile):
+    # Spooling the upload to disk so worker processes can read pages from it
+    path = spool_to_temp_file(pdf_file.file)
+    try:
+        index_pdf(db, pdf_record, path)
+    finally:
+        os.remove(path)
+
+def ensure_vector_store(db: Session, pdf_record: PDFFile):
+    # Rebuilding a document's vectors and keyword index from the database if they were lost (e.g. a fresh local store)
+    vector_store = get_vector_store()
+    bm25_store = get_bm25_store()
+    document_id = get_document_id(pdf_record)
+    missing_vectors = not vector_store.has_document(document_id)
+    missing_keywords = not bm25_store.has_document(document_id)
+    if missing_vectors or missing_keywords:
+        # Loading all embeddings in one batched SELECT instead of a lazy load on attribute access
+        pdf_record = (
+            db.query(PDFFile)
+            .options(selectinload(PDFFile.embeddings))
+            .filter(PDFFile.id == pdf_record.id)
+            .populate_existing()
+            .one()
         )
-    
-    index = pc.Index(index_name)  # Getting the index
-    
-    # Upserting (inserting or updating) vectors into the index
-    for i, (chunk, embedding) in enumerate(zip(text_chunks, embeddings)):
-        index.upsert(vectors=[{
-            'id': f'vec{i}',
-            'values': embedding,
-            'metadata': {'text': chunk}
-        }])
-    
-    return index  # Returning the index
+        rows = [e for e in pdf_record.embeddings if e.text is not None]
+        if not rows:
+            # Documents indexed before chunk texts were stored cannot be rebuilt from the database
+            raise HTTPException(status_code=409, detail="Document has no stored chunks; upload the PDF again")
+        metadata = [e.chunk_metadata() for e in rows]
+        if missing_vectors:
+            with span("vector.upsert"):
+                # Upserting over whatever is there: the store's view may only lag behind, so nothing is deleted here
+                vector_store.add(
+                    document_id, [e.text for e in rows], [e.as_array() for e in rows], metadata, replace=False
+                )
+        if missing_keywords:
+            with span("bm25.index"):
+                bm25_store.add(document_id, [e.text for e in rows], metadata)
 
-def get_conversational_chain():
-    # Defining the prompt template for generating conversational responses
-    prompt_template = """
+# Prompt for answering questions from retrieved PDF context
+QA_PROMPT_TEMPLATE = """
     Answer the question in detail as much as possible from the provided context, make sure to provide all the 
     details, if the answer is not in the provided context just say, "answer is not available in the context", do not
-    provide the wrong answer\n\n
+    provide the wrong answer. Each context passage starts with the pages it comes from in brackets; cite them as
+    (p. N) after the statements they support\n\n
     Context:\n{context}?\n
     Question:\n{question}\n
 
     Answer:
     """
-    
+
+def build_conversational_chain():
+    if use_fakes():
+        return FakeChain(QA_PROMPT_TEMPLATE, output_key="text")  # Same input and output shape as the LLMChain
+
+    # Importing LangChain lazily so the import cost is paid when the chain is built
+    from langchain.prompts import PromptTemplate
+    from langchain.chains import LLMChain
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     # Initializing the chat model with specific parameters
     model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
     # Creating a PromptTemplate with the defined template and input variables
-    prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
+    prompt = PromptTemplate(template=QA_PROMPT_TEMPLATE, input_variables=["context", "question"])
     # Returning an LLMChain with the chat model and prompt
     return LLMChain(llm=model, prompt=prompt)
 
-def generate_answer(question: str, index: Pinecone) -> str:
-    # Initializing the embeddings model
-    embeddings_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+registry.register("pdf_qa_chain", build_conversational_chain, eager=True)  # Building the chain once, at startup
+
+def get_conversational_chain():
+    return registry.get("pdf_qa_chain")
+
+def hybrid_search(question: str, query_embedding, document_id: str, vector_store: VectorStore) -> List[dict]:
+    # Combining dense matches with BM25 keyword matches, so exact terms (formulas, names, section numbers) are found
+    with span("vector.query"):
+        dense = vector_store.query(document_id, query_embedding, top_k=DENSE_TOP_K)
+    with span("bm25.query"):
+        keyword = get_bm25_store().query(document_id, question, top_k=BM25_TOP_K)
+    return fuse_rankings([dense, keyword])
+
+async def generate_answer(question: str, document_id: str, vector_store: VectorStore) -> Tuple[str, List[int]]:
     # Generating the embedding for the query
-    query_embedding = embeddings_model.embed_query(question)
+    query_embedding = await get_embedding_client().aembed_query(question)
     
-    # Querying the Pinecone index to get the top 5 matches
-    response = index.query(vector=query_embedding, top_k=5, include_metadata=True)
+    # Retrieving candidates from both the vector store and the keyword index
+    matches = await run_blocking(hybrid_search, question, query_embedding, document_id, vector_store)
     
-    # Combining the context from the top matches
-    context = " ".join([match['metadata']['text'] for match in response['matches']])
+    # Combining the context from the best matches, within the prompt's token budget
+    selected = select_context(matches)
+    context = format_context(selected)
     
     # Getting the conversational chain
     chain = get_conversational_chain()
     # Running the chain with the context and question to generate an answer
-    return chain.run(context=context, question=question)
+    with span("llm.pdf_answer"):
+        result = await chain.ainvoke({"context": context, "question": question})
+    record_tokens("llm.pdf_answer", prompt=context + question, completion=result["text"])
+    return result["text"], cited_pages(selected)  # Returning the answer with the pages its context came from
+
+async def save_upload(pdf_file: UploadFile) -> tuple:
+    # Streaming the upload to a file in UPLOAD_DIR while hashing it, returning (path, content hash)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    out = await run_blocking(tempfile.NamedTemporaryFile, dir=UPLOAD_DIR, suffix=".pdf", delete=False)
+    try:
+        while block := await pdf_file.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+            await run_blocking(out.write, block)
+    finally:
+        await run_blocking(out.close)
+    return out.name, digest.hexdigest()
+
+def run_ingest_job(pdf_file_id: int, path: str):
+    # Background job: extracting, chunking, embedding and indexing an uploaded PDF with its own session
+    db = SessionLocal()
+    try:
+        pdf_record = db.get(PDFFile, pdf_file_id)
+        pdf_record.status = "processing"
+        db.commit()
+        index_pdf(db, pdf_record, path)  # Commits the embeddings together with the ready status
+    except Exception as e:
+        logger.exception(f"Ingest of document {pdf_file_id} failed")
+        db.rollback()
+        pdf_record = db.get(PDFFile, pdf_file_id)
+        pdf_record.status = "failed"
+        pdf_record.error = str(e)
+        pdf_record.upload_path = None
+        db.commit()
+    finally:
+        db.close()
+        release_ingest(pdf_file_id)
+        if os.path.exists(path):
+            os.remove(path)  # Removing the uploaded file once it has been ingested (or has failed)
+
+def claim_ingest(pdf_file_id: int) -> bool:
+    # Marking a document as being ingested; False if a job for it is already queued or running
+    with active_jobs_lock:
+        if pdf_file_id in active_jobs:
+            return False
+        active_jobs.add(pdf_file_id)
+        return True
+
+def release_ingest(pdf_file_id: int):
+    with active_jobs_lock:
+        active_jobs.discard(pdf_file_id)
+
+def find_or_create_record(db: Session, name: str, content_hash: str) -> PDFFile:
+    # Fetching the record for these contents, creating it if needed; a concurrent upload of the same new
+    # contents may insert it first, in which case the unique content hash rejects ours and theirs is used
+    pdf_record = db.query(PDFFile).filter(PDFFile.content_hash == content_hash).first()
+    if pdf_record is not None:
+        return pdf_record
+    pdf_record = PDFFile(name=name, content_hash=content_hash, indexed=False, status="pending")
+    db.add(pdf_record)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        pdf_record = db.query(PDFFile).filter(PDFFile.content_hash == content_hash).one()
+    return pdf_record
+
+def is_up_to_date(pdf_record: PDFFile) -> bool:
+    # Ready and chunked by the current chunker; anything else is (re-)ingested when its contents are uploaded
+    return pdf_record.status == "ready" and pdf_record.chunker_version == CHUNKER_VERSION
+
+def register_upload(db: Session, name: str, content_hash: str, path: str) -> PDFFile:
+    # Recording an upload and queueing its ingest job (blocking database work)
+    if os.path.getsize(path) == 0:
+        os.remove(path)
+        raise ValueError("The uploaded file is empty")
+
+    pdf_record = find_or_create_record(db, name, content_hash)
+    if is_up_to_date(pdf_record):
+        # Identical contents were already ingested, nothing to do
+        os.remove(path)
+        return pdf_record
+    if not claim_ingest(pdf_record.id):
+        # A job for the same contents is already queued or running, and keeps its status
+        os.remove(path)
+        return pdf_record
+    # New contents, a retry of a failed or interrupted ingest, or re-indexing with the current chunker; the path
+    # is recorded so the job can be resumed if it is interrupted
+    pdf_record.status = "pending"
+    pdf_record.error = None
+    pdf_record.upload_path = path
+    db.commit()
+    ingest_executor.submit(run_ingest_job, pdf_record.id, path)
+    return pdf_record
+
+def sweep_orphaned_uploads(keep: Set[str]) -> int:
+    # Removing uploads no record refers to, e.g. left by a crash between an ingest finishing and its file removal
+    if not os.path.isdir(UPLOAD_DIR):
+        return 0
+    removed = 0
+    for entry in os.scandir(UPLOAD_DIR):
+        if entry.is_file() and entry.name.endswith(".pdf") and os.path.abspath(entry.path) not in keep:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+def resume_interrupted_ingests() -> int:
+    # Called at startup: jobs cancelled at shutdown or cut off by a crash left their records pending or processing.
+    # Those whose upload is still on disk are queued again; the rest are marked failed
+    db = SessionLocal()
+    try:
+        resumed = []
+        for pdf_record in db.query(PDFFile).filter(PDFFile.status.in_(("pending", "processing"))):
+            if pdf_record.upload_path and os.path.exists(pdf_record.upload_path):
+                pdf_record.status = "pending"
+                resumed.append((pdf_record.id, pdf_record.upload_path))
+            else:
+                pdf_record.status = "failed"
+                pdf_record.error = INTERRUPTED_ERROR
+                pdf_record.upload_path = None
+        db.commit()
+    finally:
+        db.close()
+
+    removed = sweep_orphaned_uploads({os.path.abspath(path) for _, path in resumed})
+    if removed:
+        logger.info(f"Removed {removed} orphaned uploads")
+    for pdf_file_id, path in resumed:
+        if claim_ingest(pdf_file_id):
+            ingest_executor.submit(run_ingest_job, pdf_file_id, path)
+    if resumed:
+        logger.info(f"Resuming {len(resumed)} interrupted PDF ingests")
+    return len(resumed)
+
+def load_ready_document(db: Session, document_id: int) -> PDFFile:
+    # Fetching a document that can answer questions, rebuilding its vectors if the store lost them
+    pdf_record = db.get(PDFFile, document_id)
+    if pdf_record is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if pdf_record.status != "ready":
+        raise HTTPException(status_code=409, detail=f"Document is not ready (status: {pdf_record.status})")
+    ensure_vector_store(db, pdf_record)
+    return pdf_record
+
+@router.post("/upload", response_model=PDFUploadResponse)
+async def upload_pdf(pdf_file: UploadFile = File(...), db: Session = Depends(get_db)):
+    path, content_hash = await save_upload(pdf_file)  # Saving the upload to disk and fingerprinting it
+    try:
+        pdf_record = await run_blocking(register_upload, db, pdf_file.filename, content_hash, path)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return PDFUploadResponse(document_id=pdf_record.id, status=pdf_record.status)
+
+def get_pdf_record(document_id: int) -> PDFFile:
+    db = SessionLocal()
+    try:
+        return db.get(PDFFile, document_id)
+    finally:
+        db.close()
+
+async def fetch_pdf_record(document_id: int) -> PDFFile:
+    # Reading a document with the async session when configured, otherwise on the blocking pool
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.get(PDFFile, document_id)
+    return await run_blocking(get_pdf_record, document_id)
+
+@router.get("/{document_id}/status", response_model=PDFStatusResponse)
+async def get_pdf_status(document_id: int):
+    pdf_record = await fetch_pdf_record(document_id)  # Status polling is frequent, so it skips the sync session entirely
+    if pdf_record is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return PDFStatusResponse(document_id=pdf_record.id, name=pdf_record.name, status=pdf_record.status, error=pdf_record.error)
+
+@router.post("/{document_id}/ask", response_model=PDFAnswerResponse)
+async def ask_document(document_id: int, request: PDFQuestionRequest, db: Session = Depends(get_db)):
+    pdf_record = await run_blocking(load_ready_document, db, document_id)
+    try:
+        vector_store = await run_blocking(get_vector_store)
+        response, pages = await generate_answer(request.question, get_document_id(pdf_record), vector_store)
+        return PDFAnswerResponse(response=response, pages=pages)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to answer question: {str(e)}")
+
+@router.get("/embedding_cache/stats")
+async def get_embedding_cache_stats():
+    # Exposing hit/miss counters of the embedding cache
+    cache = get_embedding_client().cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+def get_or_index_upload(db: Session, pdf_file: UploadFile) -> PDFFile:
+    # Checking if the uploaded file is empty
+    if pdf_file.file.read(1) == b'':
+        raise ValueError("The uploaded file is empty")
+    pdf_file.file.seek(0)  # Reset file pointer to the beginning
+    content_hash = compute_content_hash(pdf_file.file)  # Fingerprinting the uploaded contents
+    # Identical contents map to the same record whatever the filename, so repeat uploads skip parsing and embedding
+    pdf_record = find_or_create_record(db, pdf_file.filename, content_hash)
+
+    if is_up_to_date(pdf_record):
+        # PDF exists and is indexed, make sure the vector store still holds its vectors
+        ensure_vector_store(db, pdf_record)
+        return pdf_record
+    if not claim_ingest(pdf_record.id):
+        # A background job (or another request) is ingesting the same contents
+        raise HTTPException(
+            status_code=409,
+            detail=f"Document is being processed; poll /pdf/{pdf_record.id}/status and ask /pdf/{pdf_record.id}/ask"
+        )
+    try:
+        index_uploaded_pdf(db, pdf_record, pdf_file)  # Extracting, embedding and indexing the PDF
+    except Exception as e:
+        # Recording the failure like a background job would, so the status endpoint and re-uploads see it
+        db.rollback()
+        pdf_record.status = "failed"
+        pdf_record.error = str(e)
+        db.commit()
+        raise
+    finally:
+        release_ingest(pdf_record.id)
+    return pdf_record
 
 @router.post("/ask_question/")
 async def ask_question(pdf_file: UploadFile = File(...), question: str = "", db: Session = Depends(get_db)):
     try:
-        pdf_name = pdf_file.filename  # Getting the filename of the uploaded PDF
-        pdf_record = db.query(PDFFile).filter(PDFFile.name == pdf_name).first()  # Querying the database for the PDF record
-        
-        if pdf_record is None:
-            # New PDF, process it
-            text = extract_text_from_pdf(pdf_file)  # Extracting text from the PDF
-            text_chunks = get_text_chunks(text)  # Splitting the text into chunks
-            embeddings = generate_embeddings(text_chunks)  # Generating embeddings for the text chunks
-            
-            pdf_record = PDFFile(name=pdf_name, indexed=True)  # Creating a new PDFFile record
-            db.add(pdf_record)  # Adding the record to the database
-            db.flush()  # Flushing to assign an ID to the record
-            
-            store_embeddings(db, pdf_record.id, embeddings)  # Storing the embeddings in the database
-            index = get_vector_store(text_chunks, embeddings)  # Creating/updating the vector store in Pinecone
-        elif not pdf_record.indexed:
-            # PDF exists but not indexed, process it
-            text = extract_text_from_pdf(pdf_file)  # Extracting text from the PDF
-            text_chunks = get_text_chunks(text)  # Splitting the text into chunks
-            embeddings = generate_embeddings(text_chunks)  # Generating embeddings for the text chunks
-            
-            pdf_record.indexed = True  # Marking the PDF as indexed
-            store_embeddings(db, pdf_record.id, embeddings)  # Storing the embeddings in the database
-            index = get_vector_store(text_chunks, embeddings)  # Creating/updating the vector store in Pinecone
-        else:
-            # PDF exists and is indexed, fetch existing embeddings
-            embeddings = [eval(e.embedding) for e in pdf_record.embeddings]  # Fetching existing embeddings from the database
-            index = get_vector_store([], embeddings)  # Creating/updating the vector store in Pinecone
-        
-        response = generate_answer(question, index)  # Generating an answer to the question
-        return {"response": response}  # Returning the response
+        # Hashing, extraction, embedding and database work run on the blocking pool
+        pdf_record = await run_blocking(get_or_index_upload, db, pdf_file)
+        vector_store = await run_blocking(get_vector_store)
+        response, pages = await generate_answer(question, get_document_id(pdf_record), vector_store)  # Generating an answer to the question
+        return {"response": response, "pages": pages}  # Returning the response with the pages it draws on
     
+    except HTTPException:
+        raise
     except ValueError as ve:
         # Raising an HTTP exception for value errors
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         # Raising an HTTP exception for other errors
-        raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
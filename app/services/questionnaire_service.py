@@ -1,29 +1,46 @@
+import asyncio  # Importing asyncio to generate sub-batches concurrently
 from fastapi import APIRouter, HTTPException  # Importing FastAPI components for routing and exception handling
-from langchain_google_genai import ChatGoogleGenerativeAI  # Importing Google Generative AI library
-from langchain.prompts import PromptTemplate  # Importing PromptTemplate to format prompts
 import json  # Importing json module to handle JSON data
 import os  # Importing os module to access environment variables
 import logging  # Importing logging module to enable logging
 import re  # Importing re module for regex operations
+from typing import List, Optional  # Importing typing helpers for type hinting
+from pydantic import ValidationError  # Importing ValidationError to skip malformed questions
 from dotenv import load_dotenv  # Importing dotenv to load environment variables from a .env file
+from ..concurrency import RateLimiter  # Importing the provider rate limiter for callers with a quota
+from ..embeddings import is_rate_limit_error  # Importing the provider rate-limit check
+from ..metrics import record_tokens, span  # Importing the stage timer and token counter
+from ..providers import FakeChatModel, use_fakes  # Importing the offline provider fakes
+from ..registry import registry  # Importing the process-wide client registry
+from ..response_cache import ResponseCache, RESPONSE_CACHE_SEMANTIC_THRESHOLD  # Importing the shared response cache
 from ..schemas import MCQQuestion, MCQRequest, MCQResponse  # Importing request and response schemas
 
 load_dotenv()  # Loading environment variables from a .env file
 
 router = APIRouter()  # Creating a new FastAPI router instance
-logging.basicConfig(level=logging.INFO)  # Setting the logging level to INFO
 logger = logging.getLogger(__name__)  # Creating a logger instance
 
-# Function to get the language model
-def get_llm():
+# Questions requested per LLM call, how many calls run at once, and how many extra rounds may fill in failed batches
+MCQ_BATCH_SIZE = int(os.getenv("MCQ_BATCH_SIZE", "10"))
+MCQ_CONCURRENCY = int(os.getenv("MCQ_CONCURRENCY", "5"))
+MCQ_MAX_RETRIES = int(os.getenv("MCQ_MAX_RETRIES", "2"))
+
+MCQ_PROMPT_VERSION = "2"  # Bump whenever the prompt changes so cached questions are not reused
+mcq_cache = ResponseCache("mcq", MCQ_PROMPT_VERSION, semantic_threshold=RESPONSE_CACHE_SEMANTIC_THRESHOLD)  # Cache of generated MCQs per topic and count
+
+# Function to build the language model
+def build_llm():
+    if use_fakes():
+        return FakeChatModel()  # Streams a JSON array of the requested number of questions
+    from langchain_google_genai import ChatGoogleGenerativeAI  # Importing lazily to keep application start-up fast
     return ChatGoogleGenerativeAI(model="gemini-pro", google_api_key=os.getenv("GOOGLE_API_KEY"))
 
-# Function to get the prompt template for generating MCQs
-def get_mcq_prompt():
-    return PromptTemplate(
-        template="""
+# Prompt for one sub-batch of MCQs; a plain str.format template, so building it needs no LangChain import
+MCQ_PROMPT_TEMPLATE = """
         Generate a multiple-choice questionnaire on the topic: {topic}
         Number of questions: {num_questions}
+        This is part {part} of {parts} of a larger questionnaire on the same topic. Focus on a different
+        subtopic or angle for each part so that questions do not repeat across parts.
 
         Format the response as a valid JSON array of objects. Each object should have these properties:
         - QuestionNumber: integer (starting from 1)
@@ -35,40 +52,142 @@ def get_mcq_prompt():
         Ensure the entire response is a valid JSON array that can be parsed by JSON.parse().
         Do not include any text before or after the JSON array.
         Do not wrap the JSON in code block formatting (i.e., do not use ```json or ```).
-        """,
-        input_variables=["topic", "num_questions"]
-    )
+        """
+
+registry.register("mcq_llm", build_llm, eager=True)  # Building the model once, at startup
+
+# Function to get the language model
+def get_llm():
+    return registry.get("mcq_llm")
+
+class JSONObjectStreamParser:
+    # Incremental parser for a streamed JSON array: returns each complete top-level object as soon as its
+    # closing brace arrives, ignoring brackets, commas and code fences between objects
+
+    def __init__(self):
+        self._buffer = []  # Characters of the object being read
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
 
-# Function to generate MCQs using the language model
-def generate_mcqs(topic: str, num_questions: int) -> list[MCQQuestion]:
+    def feed(self, text: str) -> List[object]:
+        # Returning parsed dicts, or the JSONDecodeError for an object that could not be parsed
+        results = []
+        for char in text:
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._buffer = [char]
+                continue
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        results.append(json.loads("".join(self._buffer)))
+                    except json.JSONDecodeError as e:
+                        results.append(e)
+        return results
+
+def normalize_question(text: str) -> str:
+    # Questions that differ only in case, spacing or punctuation count as duplicates
+    return re.sub(r"[\W_]+", " ", text).strip().lower()
+
+# Function to generate one sub-batch of MCQs, validating each question as it streams in
+async def generate_mcq_batch(topic: str, num_questions: int, part: int, parts: int) -> List[MCQQuestion]:
     llm = get_llm()
-    prompt = get_mcq_prompt()
-    
-    try:
-        # Generating text from the language model using the formatted prompt
-        generated_text = llm.invoke(prompt.format(topic=topic, num_questions=num_questions)).content.strip()
-        logger.info(f"Generated text: {generated_text}")
-        
-        # Remove ```json and ``` if present
-        cleaned_text = re.sub(r'^```json\n|\n```$', '', generated_text, flags=re.MULTILINE)
-        
-        # Parse the cleaned text as JSON
-        mcq_data = json.loads(cleaned_text)
-        return [MCQQuestion(**question) for question in mcq_data]
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON parsing error: {str(e)}")
-        logger.error(f"Cleaned text: {cleaned_text}")
-        raise ValueError(f"Failed to parse generated MCQs: {str(e)}")
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        raise
+    prompt = MCQ_PROMPT_TEMPLATE.format(topic=topic, num_questions=num_questions, part=part, parts=parts)
+    parser = JSONObjectStreamParser()
+    questions = []
+    completion = []
+    with span("llm.mcq"):
+        async for chunk in llm.astream(prompt):
+            completion.append(chunk.content)
+            for item in parser.feed(chunk.content):
+                if isinstance(item, Exception) or not isinstance(item, dict):
+                    logger.warning(f"Skipping unparsable question in part {part}: {item}")
+                    continue
+                try:
+                    questions.append(MCQQuestion(**item))
+                except ValidationError as e:
+                    logger.warning(f"Skipping invalid question in part {part}: {e.errors()}")
+    record_tokens("llm.mcq", prompt=prompt, completion="".join(completion))
+    return questions[:num_questions]
+
+# Function to generate MCQs: large requests are split into concurrent sub-batches, and only the
+# questions lost to failed batches, invalid items or duplicates are requested again; with a limiter,
+# every LLM call (retries included) is charged to its quota as it is made
+async def generate_mcqs(topic: str, num_questions: int, limiter: Optional[RateLimiter] = None) -> list[MCQQuestion]:
+    semaphore = asyncio.Semaphore(MCQ_CONCURRENCY)
+    collected: List[MCQQuestion] = []
+    seen = set()
+
+    async def run_batch(size: int, part: int, parts: int) -> List[MCQQuestion]:
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire()
+            return await generate_mcq_batch(topic, size, part, parts)
+
+    parts = 0  # Parts requested so far; numbering continues across retry rounds so the model is nudged towards new subtopics
+    for _ in range(MCQ_MAX_RETRIES + 1):
+        remaining = num_questions - len(collected)
+        if remaining <= 0:
+            break
+        sizes = [min(MCQ_BATCH_SIZE, remaining - start) for start in range(0, remaining, MCQ_BATCH_SIZE)]
+        first_part = parts + 1
+        parts += len(sizes)
+        results = await asyncio.gather(
+            *(run_batch(size, first_part + i, parts) for i, size in enumerate(sizes)),
+            return_exceptions=True
+        )
+        # Invalid questions are already skipped inside a sub-batch, so an exception here is a provider failure:
+        # the other sub-batches' questions are kept, but a rate limit, or every call failing, is raised as is
+        errors = [result for result in results if isinstance(result, Exception)]
+        rate_limited = [error for error in errors if is_rate_limit_error(error)]
+        if rate_limited or len(errors) == len(results):
+            raise (rate_limited or errors)[-1]
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"MCQ sub-batch failed: {result}")
+                continue
+            for question in result:
+                key = normalize_question(question.Question)
+                if key not in seen:
+                    seen.add(key)
+                    collected.append(question)
+
+    if not collected:
+        raise ValueError("Failed to generate MCQs: no valid questions were produced")
+    if len(collected) < num_questions:
+        logger.warning(f"Generated {len(collected)} of {num_questions} requested MCQs on {topic!r}")
+
+    # Renumbering the merged questions from 1
+    return [
+        question.model_copy(update={"QuestionNumber": number})
+        for number, question in enumerate(collected[:num_questions], start=1)
+    ]
 
 # API endpoint to generate MCQs
 @router.post("/generate_mcqs/", response_model=MCQResponse)
 async def generate_questionnaire(request: MCQRequest):
     try:
         # Generating questions using the topic and number of questions from the request
-        questions = generate_mcqs(request.topic, request.num_questions)
+        questions = await mcq_cache.get_or_compute(
+            request.topic,
+            lambda: generate_mcqs(request.topic, request.num_questions),
+            scope=str(request.num_questions)
+        )
         return MCQResponse(questions=questions)
     except ValueError as ve:
         logger.error(f"ValueError in generate_questionnaire: {str(ve)}")
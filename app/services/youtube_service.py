@@ -1,40 +1,137 @@
+import asyncio  # Importing asyncio to summarize transcript windows concurrently
 from fastapi import APIRouter, HTTPException  # Importing FastAPI components for routing and exception handling
-import google.generativeai as genai  # Importing Google Generative AI library
+import logging  # Importing logging module to report transcript failures
 import os  # Importing os module to access environment variables
+import re  # Importing re module to validate video IDs
+from typing import List, Optional  # Importing typing helpers for type hinting
+from urllib.parse import parse_qs, urlparse  # Importing URL parsing helpers to extract video IDs
 from dotenv import load_dotenv  # Importing dotenv to load environment variables from a .env file
-from youtube_transcript_api import YouTubeTranscriptApi  # Importing YouTubeTranscriptApi to fetch video transcripts
+from sqlalchemy.exc import IntegrityError  # Importing IntegrityError to detect transcripts saved concurrently
+from ..database import SessionLocal  # Importing SessionLocal for the transcript cache
+from ..models import YouTubeTranscript  # Importing the transcript cache model
+from ..concurrency import run_blocking  # Importing the bounded thread pool for blocking calls
+from ..metrics import record_tokens, span  # Importing the stage timer and token counter
+from ..providers import FakeGenerativeModel, FakeTranscriptApi, use_fakes  # Importing the offline provider fakes
+from ..registry import registry  # Importing the process-wide client registry
+from ..response_cache import ResponseCache  # Importing the shared response cache
+from ..streaming import sse_response, stream_cached  # Importing the server-sent events helpers
 from ..schemas import VideoConvertRequest, VideoConvertResponse, Video  # Importing request and response schemas
 
 load_dotenv()  # Loading environment variables from a .env file
 
 router = APIRouter()  # Creating a new FastAPI router instance
+logger = logging.getLogger(__name__)  # Creating a logger instance
 
-# Configuring Google Generative AI with the API key from environment variables
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Transcripts longer than one window are summarized window by window (map) and then merged (reduce)
+TRANSCRIPT_WINDOW_CHARS = int(os.getenv("TRANSCRIPT_WINDOW_CHARS", "12000"))
+TRANSCRIPT_WINDOW_OVERLAP = int(os.getenv("TRANSCRIPT_WINDOW_OVERLAP", "500"))
+# Number of window summaries generated at once
+TRANSCRIPT_MAP_CONCURRENCY = int(os.getenv("TRANSCRIPT_MAP_CONCURRENCY", "8"))
+# Partial notes are merged in groups no longer than this, level by level, until one set of notes remains
+TRANSCRIPT_REDUCE_MAX_CHARS = int(os.getenv("TRANSCRIPT_REDUCE_MAX_CHARS", "30000"))
 
-# Function to extract transcript from a YouTube video
-def extract_transcript(youtube_video_url):
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")  # YouTube video IDs are 11 URL-safe characters
+
+VIDEO_NOTES_PROMPT_VERSION = "2"  # Bump whenever the prompt changes so cached notes are not reused
+video_notes_cache = ResponseCache("video_notes", VIDEO_NOTES_PROMPT_VERSION, case_sensitive=True)  # Cache of notes per video and subject (exact match only)
+
+def build_gemini_model():
+    if use_fakes():
+        return FakeGenerativeModel()
+    import google.generativeai as genai  # Importing lazily to keep application start-up fast
+    # Configuring Google Generative AI with the API key from environment variables
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel('gemini-pro')  # Initializing the generative model
+
+registry.register("gemini_pro", build_gemini_model, eager=True)  # Building the model once, at startup
+
+def get_gemini_model():
+    return registry.get("gemini_pro")
+
+def build_transcript_api():
+    if use_fakes():
+        return FakeTranscriptApi()
+    from youtube_transcript_api import YouTubeTranscriptApi  # Importing lazily; only this endpoint needs it
+    return YouTubeTranscriptApi
+
+registry.register("transcript_api", build_transcript_api)
+
+def get_transcript_api():
+    return registry.get("transcript_api")
+
+# Function to extract the video ID from the common YouTube URL shapes
+def parse_video_id(youtube_video_url: str) -> str:
+    parsed = urlparse(youtube_video_url)
+    host = (parsed.hostname or "").lower()
+    path_parts = [part for part in parsed.path.split("/") if part]
+    video_id = None
+    if host == "youtu.be" and path_parts:
+        video_id = path_parts[0]  # https://youtu.be/<id>
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        if parsed.path == "/watch":
+            video_id = parse_qs(parsed.query).get("v", [None])[0]  # https://www.youtube.com/watch?v=<id>&t=42
+        elif len(path_parts) >= 2 and path_parts[0] in ("embed", "shorts", "live", "v"):
+            video_id = path_parts[1]  # https://www.youtube.com/embed/<id>, /shorts/<id>, /live/<id>
+    if not video_id or not VIDEO_ID_PATTERN.match(video_id):
+        raise ValueError(f"Could not find a YouTube video ID in {youtube_video_url}")
+    return video_id
+
+def load_cached_transcript(video_id: str) -> Optional[str]:
+    db = SessionLocal()
     try:
-        # Extracting the video ID from the YouTube URL
-        video_id = youtube_video_url.split("=")[-1]
+        record = db.get(YouTubeTranscript, video_id)
+        return record.text if record else None
+    finally:
+        db.close()
 
-        # Fetching the transcript using the YouTubeTranscriptApi
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
+def save_transcript(video_id: str, text: str):
+    db = SessionLocal()
+    try:
+        db.merge(YouTubeTranscript(video_id=video_id, text=text))
+        db.commit()
+    except IntegrityError:
+        # A concurrent request fetched and saved the same video first; its copy is kept
+        db.rollback()
+    finally:
+        db.close()
 
-        # Combining the transcript text into a single string
-        transcript_text = ""
-        for i in transcript:
-            transcript_text += " " + i["text"]
+# Function to extract transcript from a YouTube video, served from the database after the first fetch
+def extract_transcript(video_id: str) -> Optional[str]:
+    cached = load_cached_transcript(video_id)
+    if cached is not None:
+        return cached
 
-        return transcript_text  # Returning the combined transcript text
+    try:
+        # Fetching the transcript using the YouTubeTranscriptApi
+        with span("youtube.transcript"):
+            transcript = get_transcript_api().get_transcript(video_id)
     except Exception as e:
-        print(f"Error extracting transcript: {e}")  # Printing error message
+        logger.warning(f"Error extracting transcript for {video_id}: {e}")
         return None  # Returning None if an error occurs
 
-# Function to generate notes from the transcript text
-def generate_notes(transcript_text: str, subject: str) -> str:
-    # Defining the prompt for generating notes
-    prompt = f"""
+    # Combining the transcript text into a single string
+    transcript_text = " ".join(item["text"] for item in transcript)
+    save_transcript(video_id, transcript_text)
+    return transcript_text  # Returning the combined transcript text
+
+def split_transcript(transcript_text: str, window: int = TRANSCRIPT_WINDOW_CHARS, overlap: int = TRANSCRIPT_WINDOW_OVERLAP) -> List[str]:
+    # Cutting the transcript into overlapping windows, breaking at whitespace where possible
+    windows = []
+    start = 0
+    while start < len(transcript_text):
+        end = min(start + window, len(transcript_text))
+        if end < len(transcript_text):
+            space = transcript_text.rfind(" ", start + window // 2, end)
+            end = space if space != -1 else end
+        windows.append(transcript_text[start:end].strip())
+        if end == len(transcript_text):
+            break
+        start = max(end - overlap, start + 1)
+    return [w for w in windows if w]
+
+# Function to build the prompt for generating notes from the transcript text
+def build_notes_prompt(transcript_text: str, subject: str) -> str:
+    return f"""
         Title: Detailed Notes on {subject} from YouTube Video Transcript
 
         As an expert in {subject}, your task is to provide detailed notes based on the transcript of a YouTube video I'll provide. Assume the role of a student and generate comprehensive notes covering the key concepts discussed in the video.
@@ -51,33 +148,149 @@ def generate_notes(transcript_text: str, subject: str) -> str:
         {transcript_text}
     """
 
-    # Initializing the generative model
-    model = genai.GenerativeModel('gemini-pro')
-    # Generating the content using the model
-    response = model.generate_content(prompt)
-    return response.text  # Returning the generated notes
+# Function to build the prompt summarizing one window of a long transcript (map step)
+def build_window_prompt(window_text: str, subject: str, part: int, parts: int) -> str:
+    return f"""
+        You are an expert in {subject} taking notes on a long YouTube lecture. Below is part {part} of {parts}
+        of its transcript. Write detailed notes on this part only: the main ideas, definitions, examples and
+        applications it covers, using headings and bullet points. Do not add an introduction or conclusion.
+
+        Transcript part {part} of {parts}:
+
+        {window_text}
+    """
+
+# Function to build the prompt merging partial notes into one set of notes (reduce step)
+def build_merge_prompt(partial_notes: List[str], subject: str) -> str:
+    sections = "\n\n".join(f"--- Notes on part {i} ---\n{notes}" for i, notes in enumerate(partial_notes, start=1))
+    return f"""
+        Title: Detailed Notes on {subject} from YouTube Video Transcript
+
+        As an expert in {subject}, merge the following partial notes, taken on consecutive parts of one YouTube
+        video, into a single set of comprehensive notes. Keep every key concept, remove repetition between
+        parts, and keep the order in which topics were presented.
+
+        Your notes should:
+
+        - Analyze and explain the main ideas, theories, or concepts presented in the video.
+        - Provide examples, illustrations, or case studies to support the understanding of the topic.
+        - Offer insights or practical applications of the subject matter discussed.
+        - Use clear language and concise explanations to facilitate learning.
+
+        {sections}
+    """
+
+async def generate_text(prompt: str) -> str:
+    model = get_gemini_model()  # Getting the shared generative model
+    # Generating the content using the model's async client
+    with span("llm.video_notes"):
+        response = await model.generate_content_async(prompt)
+    record_tokens("llm.video_notes", prompt=prompt, completion=response.text)
+    return response.text
+
+async def summarize_windows(transcript_text: str, subject: str) -> List[str]:
+    # Map step: summarizing every window concurrently, so a long lecture takes about as long as one window
+    windows = split_transcript(transcript_text)
+    semaphore = asyncio.Semaphore(TRANSCRIPT_MAP_CONCURRENCY)
+
+    async def summarize(i: int, window_text: str) -> str:
+        async with semaphore:
+            return await generate_text(build_window_prompt(window_text, subject, i, len(windows)))
+
+    return list(await asyncio.gather(*(summarize(i, w) for i, w in enumerate(windows, start=1))))
+
+async def reduce_partial_notes(partial_notes: List[str], subject: str) -> List[str]:
+    # Merging groups of partial notes concurrently until everything fits into one final merge prompt
+    while len(partial_notes) > 1 and sum(len(notes) for notes in partial_notes) > TRANSCRIPT_REDUCE_MAX_CHARS:
+        groups, current, size = [], [], 0
+        for notes in partial_notes:
+            if current and size + len(notes) > TRANSCRIPT_REDUCE_MAX_CHARS:
+                groups.append(current)
+                current, size = [], 0
+            current.append(notes)
+            size += len(notes)
+        groups.append(current)
+        if len(groups) == len(partial_notes):
+            break  # Every summary is already too long to pair up; merging them all at once is the best we can do
+        async def merge(group: List[str]) -> str:
+            return await generate_text(build_merge_prompt(group, subject)) if len(group) > 1 else group[0]
+
+        partial_notes = list(await asyncio.gather(*(merge(group) for group in groups)))
+    return partial_notes
+
+async def build_final_prompt(transcript_text: str, subject: str) -> str:
+    # Short transcripts use the single-pass prompt; long ones are mapped and reduced first
+    if len(transcript_text) <= TRANSCRIPT_WINDOW_CHARS:
+        return build_notes_prompt(transcript_text, subject)
+    partial_notes = await reduce_partial_notes(await summarize_windows(transcript_text, subject), subject)
+    return build_merge_prompt(partial_notes, subject)
+
+# Function to generate notes from the transcript text
+async def generate_notes(transcript_text: str, subject: str) -> str:
+    return await generate_text(await build_final_prompt(transcript_text, subject))  # Returning the generated notes
+
+async def video_to_notes(video_id: str, subject: str) -> str:
+    # Extracting the transcript text from the YouTube video (the transcript API has no async client)
+    transcript_text = await run_blocking(extract_transcript, video_id)
+    if not transcript_text:
+        raise ValueError("Failed to extract transcript from the video")
+    # Generating notes from the transcript text
+    return await generate_notes(transcript_text, subject)
 
 @router.post("/convert_video/", response_model=VideoConvertResponse)
 async def convert_video(request: VideoConvertRequest):
     try:
         # Extracting the video ID from the YouTube URL
-        video_id = str(request.youtube_link).split("=")[-1]
+        video_id = parse_video_id(str(request.youtube_link))
         # Constructing the thumbnail URL
         thumbnail_url = f"http://img.youtube.com/vi/{video_id}/0.jpg"
 
-        # Extracting the transcript text from the YouTube video
-        transcript_text = extract_transcript(str(request.youtube_link))
-        if not transcript_text:
-            raise HTTPException(status_code=400, detail="Failed to extract transcript from the video")
-
-        # Generating notes from the transcript text
-        notes = generate_notes(transcript_text, request.subject)
+        # Generating notes from the video, or reusing notes already generated for it and this subject
+        notes = await video_notes_cache.get_or_compute(
+            video_id,
+            lambda: video_to_notes(video_id, request.subject),
+            scope=request.subject
+        )
         
         # Creating a Video object (typically you would save this to a database)
         video = Video(url=request.youtube_link, thumbnail_url=thumbnail_url, notes=notes)
         
         # Returning the generated notes in the response
         return VideoConvertResponse(notes=notes)
+    except ValueError as ve:
+        # Raising an HTTP exception if the link is not a video or the transcript could not be extracted
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         # Raising an HTTP exception if an error occurs
         raise HTTPException(status_code=500, detail=f"Failed to convert video: {str(e)}")
+
+async def stream_video_notes(video_id: str, subject: str):
+    # Yielding the notes chunk by chunk as Gemini produces them (for long videos, once the map step is done)
+    transcript_text = await run_blocking(extract_transcript, video_id)
+    if not transcript_text:
+        raise ValueError("Failed to extract transcript from the video")
+    model = get_gemini_model()
+    prompt = await build_final_prompt(transcript_text, subject)
+    completion = []
+    with span("llm.video_notes_stream"):
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            completion.append(chunk.text)
+            yield chunk.text
+    record_tokens("llm.video_notes", prompt=prompt, completion="".join(completion))
+
+@router.post("/convert_video/stream")
+async def convert_video_stream(request: VideoConvertRequest):
+    # Extracting the video ID from the YouTube URL
+    try:
+        video_id = parse_video_id(str(request.youtube_link))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    cached = video_notes_cache.peek(video_id, scope=request.subject)
+    if cached is not None:
+        return sse_response(stream_cached(cached))
+
+    async def remember(notes: str):
+        video_notes_cache.put(video_id, notes, scope=request.subject)  # Letting later requests reuse the notes
+
+    return sse_response(stream_video_notes(video_id, request.subject), on_complete=remember)
@@ -0,0 +1,33 @@
+import json  # Importing json to encode event payloads
+from typing import AsyncIterator, Awaitable, Callable, Optional  # Importing typing helpers for type hinting
+from fastapi.responses import StreamingResponse  # Importing StreamingResponse to send tokens as they arrive
+
+def format_event(data: dict, event: Optional[str] = None) -> str:
+    # Encoding one server-sent event; JSON keeps newlines inside tokens from breaking the framing
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def sse_events(tokens: AsyncIterator[str], on_complete: Optional[Callable[[str], Awaitable[None]]] = None) -> AsyncIterator[str]:
+    # Forwarding each token as a "token" event, then a final "end" event (or an "error" event)
+    parts = []
+    try:
+        async for token in tokens:
+            if token:
+                parts.append(token)
+                yield format_event({"token": token})
+    except Exception as e:
+        yield format_event({"detail": str(e)}, event="error")
+        return
+    if on_complete is not None:
+        await on_complete("".join(parts))
+    yield format_event({}, event="end")
+
+async def stream_cached(content: str) -> AsyncIterator[str]:
+    yield content  # A cached response is sent as a single token
+
+def sse_response(tokens: AsyncIterator[str], on_complete: Optional[Callable[[str], Awaitable[None]]] = None) -> StreamingResponse:
+    return StreamingResponse(
+        sse_events(tokens, on_complete),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Stopping proxies from buffering the stream
+    )
@@ -0,0 +1,200 @@
+import json  # Importing json to persist chunk texts next to the vectors
+from abc import ABC, abstractmethod  # Importing ABC so an incomplete backend fails when it is built
+import os  # Importing os module to access environment variables and the filesystem
+import threading  # Importing threading to guard the lazily loaded index cache
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor to bound concurrent upserts
+from typing import Dict, List, Optional, Sequence, Set, Tuple  # Importing typing helpers for type hinting
+import numpy as np  # Importing NumPy for the local similarity search
+from .providers import use_fakes  # Importing the provider switch that picks the default backend
+from .registry import registry  # Importing the process-wide client registry
+
+# Vector store backend used for PDF retrieval ("pinecone" or "local")
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "local" if use_fakes() else "pinecone")
+# Directory where the local backend keeps one memory-mapped matrix per PDF
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "./vector_store")
+# Pinecone index name and embedding dimension
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "pdf-chatbot")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "768"))
+# Number of vectors sent per Pinecone upsert request and how many requests may be in flight at once
+PINECONE_UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))
+PINECONE_UPSERT_CONCURRENCY = int(os.getenv("PINECONE_UPSERT_CONCURRENCY", "4"))
+
+class VectorStore(ABC):
+    # Interface every retrieval backend implements; matches are dicts with "id", "score", "text" and
+    # "metadata" (page numbers and offsets of the chunk, when they were provided at ingest).
+    # add() replaces any previous version of the document unless replace=False, which only writes the given
+    # chunks (for rebuilding an index that went missing)
+
+    @abstractmethod
+    def add(self, document_id: str, texts: List[str], embeddings: Sequence, metadata: Optional[List[dict]] = None,
+            replace: bool = True) -> None:
+        ...
+
+    @abstractmethod
+    def query(self, document_id: str, vector: Sequence[float], top_k: int = 5) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def has_document(self, document_id: str) -> bool:
+        ...
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index_name: str = PINECONE_INDEX_NAME, dimension: int = EMBEDDING_DIMENSION):
+        from pinecone import Pinecone  # Importing Pinecone lazily so local deployments do not need it
+
+        self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))  # Initializing Pinecone with API key from environment variable
+        # Checking if the index already exists and creating it if it does not
+        if index_name not in self.pc.list_indexes().names():
+            self.pc.create_index(name=index_name, dimension=dimension, metric='cosine')
+        self.index = self.pc.Index(index_name)  # Getting the index
+        self._present: Set[str] = set()  # Documents known to hold vectors, so questions skip describe_index_stats
+
+    def add(self, document_id: str, texts: List[str], embeddings: Sequence, metadata: Optional[List[dict]] = None,
+            replace: bool = True) -> None:
+        # Each PDF gets its own namespace and IDs, so one document never overwrites another
+        metadata = metadata or [{} for _ in texts]
+        vectors = [
+            {
+                'id': f'{document_id}-{i}',
+                'values': [float(value) for value in embedding],
+                'metadata': {**extra, 'text': chunk}
+            }
+            for i, (chunk, embedding, extra) in enumerate(zip(texts, embeddings, metadata))
+        ]
+        if replace and self.has_document(document_id):
+            # Clearing a previous version of the document so no stale chunks survive a re-index
+            self.index.delete(delete_all=True, namespace=document_id)
+            self._present.discard(document_id)
+
+        # Upserting in bulk batches with a bounded number of concurrent requests
+        batches = [
+            vectors[start:start + PINECONE_UPSERT_BATCH_SIZE]
+            for start in range(0, len(vectors), PINECONE_UPSERT_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=PINECONE_UPSERT_CONCURRENCY) as executor:
+            # Consuming the results so the first failed batch raises here
+            list(executor.map(lambda batch: self.index.upsert(vectors=batch, namespace=document_id), batches))
+        if vectors:
+            self._present.add(document_id)
+
+    def query(self, document_id: str, vector: Sequence[float], top_k: int = 5) -> List[dict]:
+        # Querying only the document's namespace and normalizing the matches
+        response = self.index.query(
+            vector=[float(value) for value in vector],
+            top_k=top_k,
+            include_metadata=True,
+            namespace=document_id
+        )
+        return [
+            {
+                "id": match['id'],
+                "score": match['score'],
+                "text": match['metadata']['text'],
+                "metadata": {key: value for key, value in match['metadata'].items() if key != 'text'}
+            }
+            for match in response['matches']
+        ]
+
+    def has_document(self, document_id: str) -> bool:
+        # A document is present when its namespace holds at least one vector. Only positive answers are cached:
+        # index stats are eventually consistent, so a fresh upsert may not be counted yet
+        if document_id in self._present:
+            return True
+        namespaces = self.index.describe_index_stats().get('namespaces', {})
+        if namespaces.get(document_id, {}).get('vector_count', 0) > 0:
+            self._present.add(document_id)
+            return True
+        return False
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, directory: str = VECTOR_STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._indexes: Dict[str, Tuple[np.ndarray, List[str], List[dict]]] = {}  # Loaded (matrix, texts, metadata) per document
+        self._lock = threading.Lock()
+
+    def _paths(self, document_id: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, document_id)
+        return f"{base}.npy", f"{base}.json"
+
+    def add(self, document_id: str, texts: List[str], embeddings: Sequence, metadata: Optional[List[dict]] = None,
+            replace: bool = True) -> None:
+        # Normalizing once at write time so a query is a single matrix product; the files are always
+        # rewritten whole, so replace makes no difference here
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = matrix.reshape(0, 0)  # A document without chunks gets an empty index instead of a 1-D array
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        matrix_path, texts_path = self._paths(document_id)
+        # Writing to temporary files first so readers never see a half-written index
+        with open(f"{matrix_path}.tmp", "wb") as f:
+            np.save(f, matrix)
+        with open(f"{texts_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"texts": list(texts), "metadata": metadata or [{} for _ in texts]}, f)
+        os.replace(f"{matrix_path}.tmp", matrix_path)
+        os.replace(f"{texts_path}.tmp", texts_path)
+
+        with self._lock:
+            self._indexes.pop(document_id, None)  # Dropping any stale copy; reloaded on the next question
+
+    def _load(self, document_id: str) -> Optional[Tuple[np.ndarray, List[str], List[dict]]]:
+        # Memory-mapping the document's matrix the first time a question is asked about it
+        with self._lock:
+            if document_id in self._indexes:
+                return self._indexes[document_id]
+            matrix_path, texts_path = self._paths(document_id)
+            if not os.path.exists(matrix_path):
+                return None
+            matrix = np.load(matrix_path, mmap_mode="r")
+            with open(texts_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):  # Indexes written before chunk metadata existed hold only the texts
+                data = {"texts": data, "metadata": [{} for _ in data]}
+            self._indexes[document_id] = (matrix, data["texts"], data["metadata"])
+            return self._indexes[document_id]
+
+    def query_many(self, document_id: str, vectors: Sequence, top_k: int = 5) -> List[List[dict]]:
+        # Batched cosine top-k: one matrix product for all queries, argpartition instead of a full sort
+        loaded = self._load(document_id)
+        if loaded is None:
+            return [[] for _ in vectors]
+        matrix, texts, metadata = loaded
+        if not texts:
+            return [[] for _ in vectors]
+        queries = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        scores = queries @ matrix.T
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            results.append([
+                {"id": f"{document_id}-{i}", "score": float(row[i]), "text": texts[i], "metadata": metadata[i]}
+                for i in ordered
+            ])
+        return results
+
+    def query(self, document_id: str, vector: Sequence[float], top_k: int = 5) -> List[dict]:
+        return self.query_many(document_id, [vector], top_k)[0]
+
+    def has_document(self, document_id: str) -> bool:
+        return os.path.exists(self._paths(document_id)[0])
+
+def build_vector_store() -> VectorStore:
+    # Creating the configured backend; Pinecone is only imported (and its index checked) when selected
+    if VECTOR_STORE_BACKEND == "local":
+        return LocalVectorStore()
+    if VECTOR_STORE_BACKEND == "pinecone":
+        return PineconeVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+
+registry.register("vector_store", build_vector_store, eager=True)  # Building the backend once, at startup
+
+def get_vector_store() -> VectorStore:
+    # Reusing the backend (and its cached index handle) for every request
+    return registry.get("vector_store")
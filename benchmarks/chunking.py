@@ -0,0 +1,117 @@
+import argparse  # Importing argparse to read benchmark options from the command line
+import asyncio  # Importing asyncio to time real answers through the async chain
+import json  # Importing json to load the fixture corpus and print results
+import os  # Importing os module to locate the fixture
+import statistics  # Importing statistics for size and latency summaries
+import tempfile  # Importing tempfile to hold the local indexes
+import time  # Importing time for timing measurements
+from app.bm25 import BM25Store  # Importing the keyword index
+from app.chunking import chunk_pages  # Importing the token-aware chunker
+from app.embeddings import EmbeddingClient, FakeEmbeddingBackend  # Importing the offline embedding backend
+from app.retrieval import count_tokens, format_context, fuse_rankings, select_context  # Importing context assembly helpers
+from app.vector_store import LocalVectorStore  # Importing the local dense index
+
+# Benchmark comparing the previous 10,000/1,000-character splitter (top 5 chunks joined) with the
+# token-aware chunker (budgeted, page-labelled context): prompt size, whether the relevant section
+# made it into the prompt and, with --llm, answer latency of the real QA chain.
+# Run with: python -m benchmarks.chunking --filler 30 [--llm]
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval_corpus.json")
+FILLER = (
+    "This paragraph restates material from earlier chapters and gives background that the exercises "
+    "at the end of the unit refer back to, without introducing any new terms."
+)
+
+def build_pages(chunks: list, filler: int, sections_per_page: int = 2) -> list:
+    # Laying the fixture sections out as pages: a heading line, the section text and filler paragraphs
+    sections = []
+    for chunk in chunks:
+        heading, _, body = chunk.partition(". ")
+        sections.append(f"{heading}\n{body}\n\n" + "\n\n".join([FILLER] * filler))
+    return [
+        "\n\n".join(sections[i:i + sections_per_page])
+        for i in range(0, len(sections), sections_per_page)
+    ]
+
+def baseline_chunks(pages: list) -> list:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter  # The splitter the service used before
+    splitter = RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
+    return [(text, {}) for text in splitter.split_text("\n".join(pages))]
+
+def adaptive_chunks(pages: list) -> list:
+    return [(chunk.text, chunk.metadata()) for chunk in chunk_pages(pages)]
+
+def baseline_context(matches: list) -> str:
+    return "\n\n".join(match["text"] for match in matches[:5])
+
+def adaptive_context(matches: list) -> str:
+    return format_context(select_context(matches))
+
+def measure(name: str, chunks: list, build_context, corpus: dict, client: EmbeddingClient, directory: str) -> dict:
+    texts = [text for text, _ in chunks]
+    vector_store = LocalVectorStore(os.path.join(directory, name, "vectors"))
+    bm25_store = BM25Store(os.path.join(directory, name, "bm25"))
+    vector_store.add(name, texts, client.embed_documents(texts), [metadata for _, metadata in chunks])
+    bm25_store.add(name, texts, [metadata for _, metadata in chunks])
+
+    contexts = []
+    hits = 0
+    for query in corpus["queries"]:
+        vector = client.embed_query(query["question"])
+        matches = fuse_rankings([
+            vector_store.query(name, vector, top_k=10),
+            bm25_store.query(name, query["question"], top_k=10),
+        ])
+        context = build_context(matches)
+        contexts.append((query["question"], context))
+        # A hit means the body of a relevant section is in the prompt
+        hits += any(corpus["chunks"][i].partition(". ")[2][:60] in context for i in query["relevant"])
+    tokens = [count_tokens(context) for _, context in contexts]
+    return {
+        "chunks": len(chunks),
+        "context_tokens_median": statistics.median(tokens),
+        "context_tokens_max": max(tokens),
+        "context_kb_median": round(statistics.median(len(context.encode()) for _, context in contexts) / 1024, 1),
+        "relevant_in_context": round(hits / len(contexts), 3),
+        "contexts": contexts,
+    }
+
+async def answer_latencies(contexts: list) -> list:
+    from app.services.pdf_service import get_conversational_chain  # Importing lazily; needs a Google API key
+    chain = get_conversational_chain()
+    latencies = []
+    for question, context in contexts:
+        start = time.perf_counter()
+        await chain.ainvoke({"context": context, "question": question})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt size of the chunking strategies")
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--filler", type=int, default=30, help="Filler paragraphs after each section")
+    parser.add_argument("--llm", action="store_true", help="Also time real answers from the QA chain")
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        corpus = json.load(f)
+    pages = build_pages(corpus["chunks"], args.filler)
+    client = EmbeddingClient(FakeEmbeddingBackend())
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, chunker, build_context in [
+            ("baseline", baseline_chunks, baseline_context),
+            ("adaptive", adaptive_chunks, adaptive_context),
+        ]:
+            results[name] = measure(name, chunker(pages), build_context, corpus, client, directory)
+    for name, result in results.items():
+        contexts = result.pop("contexts")
+        if args.llm:
+            latencies = asyncio.run(answer_latencies(contexts))
+            result["answer_seconds_median"] = round(statistics.median(latencies), 3)
+    print(f"{len(pages)} pages, {sum(count_tokens(page) for page in pages)} tokens")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse  # Importing argparse to read benchmark options from the command line
+import json  # Importing json to parse the legacy text format the safe way
+import sqlite3  # Importing sqlite3 to measure a real database round trip
+import time  # Importing time for timing measurements
+import numpy as np  # Importing NumPy to generate random embeddings
+from app.models import pack_embedding, unpack_embedding  # Importing the packing helpers used by the application
+
+# Benchmark comparing the legacy str()/eval() embedding format with packed binary vectors.
+# Run with: python -m benchmarks.embedding_storage --rows 2000 --dim 768
+
+def time_loads(rows, decode) -> float:
+    # Timing how long it takes to decode every stored row
+    start = time.perf_counter()
+    for value in rows:
+        decode(value)
+    return time.perf_counter() - start
+
+def sqlite_round_trip(values) -> tuple:
+    # Writing the values into an in-memory SQLite table and measuring the read back
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE e (id INTEGER PRIMARY KEY, v)")
+    conn.executemany("INSERT INTO e (v) VALUES (?)", [(value,) for value in values])
+    conn.commit()
+    start = time.perf_counter()
+    fetched = [row[0] for row in conn.execute("SELECT v FROM e")]
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return fetched, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding storage formats")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    vectors = np.random.default_rng(0).standard_normal((args.rows, args.dim)).tolist()
+    formats = {
+        "text (eval)": ([str(v) for v in vectors], eval),
+        "text (json)": ([str(v) for v in vectors], json.loads),
+        "float32": ([pack_embedding(v, "float32") for v in vectors], lambda b: unpack_embedding(b, "float32")),
+        "float16": ([pack_embedding(v, "float16") for v in vectors], lambda b: unpack_embedding(b, "float16")),
+    }
+
+    print(f"{args.rows} vectors x {args.dim} dims")
+    print(f"{'format':<14}{'bytes/row':>12}{'total MB':>12}{'fetch s':>10}{'decode s':>10}")
+    for name, (values, decode) in formats.items():
+        size = sum(len(v) for v in values) / len(values)
+        fetched, fetch_time = sqlite_round_trip(values)
+        decode_time = time_loads(fetched, decode)
+        print(f"{name:<14}{size:>12.0f}{size * len(values) / 1e6:>12.2f}{fetch_time:>10.4f}{decode_time:>10.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse  # Importing argparse to read benchmark options from the command line
+import asyncio  # Importing asyncio to time the async path
+import time  # Importing time for timing measurements
+from app.embeddings import EmbeddingClient, FakeEmbeddingBackend  # Importing the client and its offline backend
+
+# Offline benchmark showing that ingest time follows the number of batches, not chunks.
+# Run with: python -m benchmarks.embedding_throughput --chunks 300 --latency 0.2
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding batching and concurrency")
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per backend call")
+    args = parser.parse_args()
+
+    texts = [f"chunk {i} about cells, energy and photosynthesis" for i in range(args.chunks)]
+    configs = [
+        ("one call per chunk", 1, 1),
+        ("batch 100, serial", 100, 1),
+        ("batch 50, 4 in flight", 50, 4),
+    ]
+    print(f"{args.chunks} chunks, {args.latency:.2f}s per backend call")
+    for name, batch_size, concurrency in configs:
+        backend = FakeEmbeddingBackend(latency=args.latency)
+        client = EmbeddingClient(backend, batch_size=batch_size, max_concurrency=concurrency)
+        start = time.perf_counter()
+        client.embed_documents(texts)
+        sync_time = time.perf_counter() - start
+        start = time.perf_counter()
+        asyncio.run(client.aembed_documents(texts))
+        async_time = time.perf_counter() - start
+        print(f"{name:<24}{backend.calls // 2:>6} calls{sync_time:>9.2f} s sync{async_time:>9.2f} s async")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse  # Importing argparse to read benchmark options from the command line
+import json  # Importing json to encode request bodies and print results
+import statistics  # Importing statistics for latency percentiles
+import time  # Importing time for timing measurements
+import urllib.request  # Importing urllib to send requests without extra dependencies
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor to keep many requests in flight
+
+# Load-test harness measuring concurrent throughput of a running server, e.g.
+#   uvicorn app.main:app --workers 1
+#   python -m benchmarks.load_test --path /note/generate_notes/ --body '{"topic": "Cells {i}"}' --concurrency 32
+# "{i}" in the body is replaced by the request number so the response cache can be bypassed.
+# Run it against a build before and after a change to compare requests/second and latency percentiles.
+
+def send(url: str, body: str, timeout: float) -> tuple:
+    request = urllib.request.Request(url, data=body.encode(), headers={"Content-Type": "application/json"}, method="POST")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - start
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure concurrent throughput of an endpoint")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/note/generate_notes/")
+    parser.add_argument("--body", default='{"topic": "Load test topic {i}"}')
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    url = args.base_url.rstrip("/") + args.path
+    bodies = [args.body.replace("{i}", str(i)) for i in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda body: send(url, body, args.timeout), bodies))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for _, latency in results]
+    report = {
+        "url": url,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "ok": sum(1 for status, _ in results if 200 <= status < 300),
+        "errors": sum(1 for status, _ in results if not 200 <= status < 300),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 2),
+        "latency_p50_s": round(statistics.median(latencies), 4),
+        "latency_p95_s": round(percentile(latencies, 0.95), 4),
+        "latency_p99_s": round(percentile(latencies, 0.99), 4),
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
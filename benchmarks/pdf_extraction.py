@@ -0,0 +1,85 @@
+import argparse  # Importing argparse to read benchmark options from the command line
+import io  # Importing io to reproduce the previous in-memory extraction
+import os  # Importing os module to clean up the generated file
+import tempfile  # Importing tempfile to write the synthetic PDF
+import time  # Importing time for timing measurements
+from PyPDF2 import PdfReader  # Importing PdfReader for the baseline extraction
+from app.pdf_extraction import iter_page_texts, shutdown_extract_pool  # Importing the parallel extraction engine
+
+# Benchmark comparing single-core BytesIO extraction with the parallel page-level engine
+# on a synthetic multi-hundred-page PDF.
+# Run with: python -m benchmarks.pdf_extraction --pages 400 --workers 1 2 4
+
+LINE = "Photosynthesis converts light energy into chemical energy stored in glucose."
+
+def build_pdf(pages: int, lines_per_page: int = 40, label: str = "") -> bytes:
+    # Writing a minimal but valid PDF with one Helvetica text stream per page; a label makes the contents unique
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page in range(pages):
+        text = "".join(f"({LINE} {label}p{page} l{line}) Tj T* " for line in range(lines_per_page))
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text}ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def baseline(path: str) -> str:
+    # The previous implementation: whole file in a BytesIO, one core, += concatenation
+    with open(path, "rb") as f:
+        reader = PdfReader(io.BytesIO(f.read()))
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text() + "\n"
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(build_pdf(args.pages))
+        path = f.name
+    try:
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB")
+        start = time.perf_counter()
+        baseline(path)
+        print(f"{'baseline':<12}{time.perf_counter() - start:>10.3f} s")
+        for workers in args.workers:
+            shutdown_extract_pool()  # Each run sizes its own pool
+            start = time.perf_counter()
+            first_page = None
+            for i, _ in enumerate(iter_page_texts(path, workers=workers)):
+                if i == 0:
+                    first_page = time.perf_counter() - start
+            total = time.perf_counter() - start
+            print(f"{f'workers={workers}':<12}{total:>10.3f} s  (first page after {first_page:.3f} s)")
+    finally:
+        shutdown_extract_pool()
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
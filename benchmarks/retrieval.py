@@ -0,0 +1,63 @@
+import argparse  # Importing argparse to read benchmark options from the command line
+import json  # Importing json to load the fixture corpus and print results
+import os  # Importing os module to locate the fixture
+import statistics  # Importing statistics for latency summaries
+import tempfile  # Importing tempfile to hold the local indexes
+import time  # Importing time for timing measurements
+from app.bm25 import BM25Store  # Importing the keyword index
+from app.embeddings import EmbeddingClient, FakeEmbeddingBackend  # Importing the offline embedding backend
+from app.retrieval import fuse_rankings  # Importing rank fusion
+from app.vector_store import LocalVectorStore  # Importing the local dense index
+
+# Offline retrieval benchmark: recall@k and latency of dense, BM25 and hybrid retrieval over a fixture corpus.
+# Run with: python -m benchmarks.retrieval --k 1 3 5
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval_corpus.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dense, keyword and hybrid retrieval")
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        corpus = json.load(f)
+    chunks, queries = corpus["chunks"], corpus["queries"]
+    client = EmbeddingClient(FakeEmbeddingBackend())
+    document_id = "fixture"
+
+    with tempfile.TemporaryDirectory() as directory:
+        vector_store = LocalVectorStore(os.path.join(directory, "vectors"))
+        bm25_store = BM25Store(os.path.join(directory, "bm25"))
+        vector_store.add(document_id, chunks, client.embed_documents(chunks))
+        bm25_store.add(document_id, chunks)
+        depth = max(args.k) * 2
+
+        retrievers = {
+            "dense": lambda q, v: vector_store.query(document_id, v, top_k=depth),
+            "bm25": lambda q, v: bm25_store.query(document_id, q, top_k=depth),
+            "hybrid": lambda q, v: fuse_rankings([
+                vector_store.query(document_id, v, top_k=depth),
+                bm25_store.query(document_id, q, top_k=depth),
+            ]),
+        }
+        results = {}
+        for name, retrieve in retrievers.items():
+            hits = {k: 0 for k in args.k}
+            latencies = []
+            for query in queries:
+                vector = client.embed_query(query["question"])
+                start = time.perf_counter()
+                matches = retrieve(query["question"], vector)
+                latencies.append(time.perf_counter() - start)
+                ranked = [int(match["id"].rsplit("-", 1)[1]) for match in matches]
+                for k in args.k:
+                    hits[k] += any(i in query["relevant"] for i in ranked[:k])
+            results[name] = {
+                **{f"recall@{k}": round(hits[k] / len(queries), 3) for k in args.k},
+                "latency_ms_median": round(statistics.median(latencies) * 1000, 4),
+            }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
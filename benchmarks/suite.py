@@ -0,0 +1,237 @@
+import argparse  # Importing argparse to read benchmark options from the command line
+import asyncio  # Importing asyncio to drive the async service code
+import hashlib  # Importing hashlib to fingerprint the generated PDFs
+import json  # Importing json to write machine-readable results
+import os  # Importing os module to configure the application through its environment
+import platform  # Importing platform to record where the results were measured
+import statistics  # Importing statistics for latency summaries
+import subprocess  # Importing subprocess to read the git revision
+import tempfile  # Importing tempfile to keep the database, indexes and caches out of the working tree
+import time  # Importing time for timing measurements
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor to ingest PDFs concurrently
+from benchmarks.pdf_extraction import build_pdf  # Importing the synthetic PDF builder
+from benchmarks.startup import measure_cold_start  # Importing the cold start measurement shared with the startup benchmark
+
+# Offline benchmark suite: every provider (LLMs, embeddings, vector store, transcripts) is replaced by the
+# deterministic fakes of app.providers with configurable latency, and the database, indexes and caches live in
+# a temporary directory, so results are reproducible and comparable across releases.
+# Run with: python -m benchmarks.suite --output results.json
+
+def summarize(latencies: list) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+def configure_environment(directory: str, args) -> dict:
+    # Must run before any app module is imported: settings are read at import time
+    env = {
+        "PROVIDER_BACKEND": "fake",
+        "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'benchmark.db')}",
+        "VECTOR_STORE_DIR": os.path.join(directory, "vector_store"),
+        "BM25_INDEX_DIR": os.path.join(directory, "bm25_index"),
+        "EMBEDDING_CACHE_PATH": os.path.join(directory, "embedding_cache.db"),
+        "PDF_UPLOAD_DIR": os.path.join(directory, "uploads"),
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_LLM_TOKEN_LATENCY": str(args.token_latency),
+        "EMBEDDING_FAKE_LATENCY": str(args.embedding_latency),
+        "FAKE_TRANSCRIPT_LATENCY": "0",
+    }
+    os.environ.update(env)
+    return env
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def stage_seconds(stages: list) -> dict:
+    # Total time recorded per stage by app.metrics while the benchmark ran
+    from prometheus_client import REGISTRY
+    totals = {}
+    for stage in stages:
+        value = REGISTRY.get_sample_value("stage_duration_seconds_sum", {"stage": stage})
+        if value is not None:
+            totals[stage] = round(value, 4)
+    return totals
+
+def bench_startup(runs: int) -> dict:
+    # Importing the application and warming every client in a fresh interpreter
+    imports, totals = [], []
+    for _ in range(runs):
+        import_seconds, total_seconds = measure_cold_start()
+        imports.append(import_seconds)
+        totals.append(total_seconds)
+    return {
+        "runs": runs,
+        "import_seconds_median": round(statistics.median(imports), 4),
+        "import_and_warm_seconds_median": round(statistics.median(totals), 4),
+    }
+
+def create_record(name: str, content_hash: str) -> int:
+    from app.database import SessionLocal
+    from app.models import PDFFile
+    db = SessionLocal()
+    try:
+        record = PDFFile(name=name, content_hash=content_hash, indexed=False, status="pending")
+        db.add(record)
+        db.commit()
+        return record.id
+    finally:
+        db.close()
+
+def bench_ingest(directory: str, documents: int, pages: int, workers: int) -> dict:
+    # Extracting, chunking, embedding and indexing synthetic PDFs through the background ingest job
+    from app.services import pdf_service
+    jobs = []
+    for i in range(documents):
+        data = build_pdf(pages, label=f"d{i} ")
+        path = os.path.join(directory, f"ingest-{i}.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+        jobs.append((create_record(f"document-{i}.pdf", hashlib.sha256(data).hexdigest()), path))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda job: pdf_service.run_ingest_job(*job), jobs))
+    elapsed = time.perf_counter() - start
+
+    from app.database import SessionLocal
+    from app.models import PDFEmbedding, PDFFile
+    db = SessionLocal()
+    try:
+        ids = [pdf_file_id for pdf_file_id, _ in jobs]
+        failed = db.query(PDFFile).filter(PDFFile.id.in_(ids), PDFFile.status != "ready").count()
+        chunks = db.query(PDFEmbedding).filter(PDFEmbedding.pdf_file_id.in_(ids)).count()
+    finally:
+        db.close()
+    return {
+        "documents": documents,
+        "pages_per_document": pages,
+        "workers": workers,
+        "failed": failed,
+        "chunks": chunks,
+        "seconds": round(elapsed, 4),
+        "pages_per_second": round(documents * pages / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 2),
+        "stage_seconds": stage_seconds(["pdf.extract", "pdf.chunk", "pdf.embed", "vector.upsert", "bm25.index", "db.query"]),
+        "document_ids": ids,
+    }
+
+async def ask(document_id: int, question: str) -> float:
+    # The same steps as POST /pdf/{document_id}/ask
+    from app.concurrency import run_blocking
+    from app.database import SessionLocal
+    from app.services import pdf_service
+    from app.vector_store import get_vector_store
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        pdf_record = await run_blocking(pdf_service.load_ready_document, db, document_id)
+        vector_store = await run_blocking(get_vector_store)
+        await pdf_service.generate_answer(question, pdf_service.get_document_id(pdf_record), vector_store)
+    finally:
+        db.close()
+    return time.perf_counter() - start
+
+async def bench_questions(document_id: int, repeat: int) -> dict:
+    # Cold: clients rebuilt, indexes not loaded and the question embedding not cached (as after a restart);
+    # warm: the same question again with everything loaded and cached
+    from app.registry import registry
+    cold = []
+    for i in range(repeat):
+        registry.reset()
+        cold.append(await ask(document_id, f"What does photosynthesis convert, variant {i}?"))
+    question = "What does photosynthesis convert into glucose?"
+    await ask(document_id, question)
+    warm = [await ask(document_id, question) for _ in range(repeat)]
+    return {"cold": summarize(cold), "warm": summarize(warm)}
+
+async def bench_mcqs(levels: list, num_questions: int) -> dict:
+    # Concurrent MCQ requests on distinct topics, bypassing the response cache
+    from app.providers import get_fake_llm
+    from app.services.questionnaire_service import generate_mcqs
+    results = {}
+    for level in levels:
+        llm = get_fake_llm()
+        calls = llm.calls
+
+        async def timed(topic: str) -> tuple:
+            start = time.perf_counter()
+            questions = await generate_mcqs(topic, num_questions)
+            return time.perf_counter() - start, len(questions)
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(timed(f"topic {level}-{i}") for i in range(level)))
+        elapsed = time.perf_counter() - start
+        results[f"concurrency={level}"] = {
+            **summarize([seconds for seconds, _ in outcomes]),
+            "questions": sum(count for _, count in outcomes),
+            "questions_per_second": round(sum(count for _, count in outcomes) / elapsed, 2),
+            "llm_calls": llm.calls - calls,
+            "seconds": round(elapsed, 4),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with fake providers")
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.001, help="Fake LLM seconds per streamed token")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Fake embedding seconds per call")
+    parser.add_argument("--startup-runs", type=int, default=3)
+    parser.add_argument("--documents", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--ingest-workers", type=int, default=2)
+    parser.add_argument("--questions", type=int, default=10, help="Cold and warm questions each")
+    parser.add_argument("--mcq-concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--mcq-questions", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = configure_environment(directory, args)
+        results = {"startup": bench_startup(args.startup_runs)}
+
+        from app.database import init_db  # Importing after the environment points at the temporary directory
+        from app.pdf_extraction import shutdown_extract_pool
+        from app.registry import registry
+        import app.main  # noqa: F401  Registering every factory
+        init_db()
+        try:
+            # Warming before each section, as the application does at startup, so no section times a client build
+            # (bench_questions resets the registry for its cold questions)
+            registry.warm()
+            ingest = bench_ingest(directory, args.documents, args.pages, args.ingest_workers)
+            document_ids = ingest.pop("document_ids")
+            results["ingest"] = ingest
+            registry.warm()
+            results["questions"] = asyncio.run(bench_questions(document_ids[0], args.questions))
+            registry.warm()
+            results["mcq"] = asyncio.run(bench_mcqs(args.mcq_concurrency, args.mcq_questions))
+        finally:
+            shutdown_extract_pool()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {key: value for key, value in env.items() if "LATENCY" in key},
+            "arguments": vars(args),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os  # Importing os module to configure the application before it is imported
+import sys  # Importing sys to make the app package importable from the repository root
+
+# Every provider is replaced by the deterministic fakes of app.providers, so the tests run offline
+os.environ.setdefault("PROVIDER_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("FAKE_LLM_TOKEN_LATENCY", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,17 @@
+from types import SimpleNamespace  # Importing SimpleNamespace to stand in for a handled request
+from app.main import route_path  # Importing the request-latency label helper
+from app.services import batch_service, pdf_service  # Importing routers whose routes are labelled
+
+def find_route(router, path: str):
+    return next(route for route in router.routes if route.path == path)
+
+def test_route_label_includes_the_router_prefix():
+    route = find_route(pdf_service.router, "/{document_id}/ask")
+    assert route_path(SimpleNamespace(scope={"route": route})) == "/pdf/{document_id}/ask"
+
+def test_route_label_of_a_router_root():
+    route = find_route(batch_service.router, "/")
+    assert route_path(SimpleNamespace(scope={"route": route})) == "/batch/"
+
+def test_unhandled_requests_are_unmatched():
+    assert route_path(SimpleNamespace(scope={})) == "unmatched"
@@ -0,0 +1,85 @@
+import asyncio  # Importing asyncio to run the async generator
+import json  # Importing json to build streamed responses
+import pytest  # Importing pytest for assertions on raised errors
+from pydantic import ValidationError  # Importing ValidationError to check request validation
+from app.schemas import MCQ_MAX_QUESTIONS, BatchRequest, MCQQuestion, MCQRequest  # Importing the MCQ schemas and their limit
+from app.services import questionnaire_service  # Importing the module under test
+from app.services.questionnaire_service import JSONObjectStreamParser, generate_mcqs  # Importing the parser and generator
+
+def make_question(text: str, number: int = 1) -> MCQQuestion:
+    return MCQQuestion(
+        QuestionNumber=number, Question=text, A="a", B="b", C="c", D="d", CorrectAnswer="A", Explanation="because"
+    )
+
+def test_parser_returns_objects_split_across_chunks():
+    parser = JSONObjectStreamParser()
+    text = json.dumps([{"Question": "What is {x}?", "A": "a \"quoted\" } brace"}, {"Question": "Second"}])
+    results = []
+    for start in range(0, len(text), 7):
+        results.extend(parser.feed(text[start:start + 7]))
+    assert results == [{"Question": "What is {x}?", "A": "a \"quoted\" } brace"}, {"Question": "Second"}]
+
+def test_parser_ignores_code_fences_and_nested_objects_stay_whole():
+    parser = JSONObjectStreamParser()
+    results = parser.feed('```json\n[{"Question": "Q", "Meta": {"level": 1}}]\n```')
+    assert results == [{"Question": "Q", "Meta": {"level": 1}}]
+
+def test_parser_reports_unparsable_objects_and_continues():
+    parser = JSONObjectStreamParser()
+    results = parser.feed('[{"Question": oops}, {"Question": "ok"}]')
+    assert isinstance(results[0], json.JSONDecodeError)
+    assert results[1] == {"Question": "ok"}
+
+def test_duplicates_across_batches_are_requested_again(monkeypatch):
+    monkeypatch.setattr(questionnaire_service, "MCQ_BATCH_SIZE", 2)
+    calls = []
+
+    async def fake_batch(topic, size, part, parts):
+        calls.append((size, part, parts))
+        if part == 1:
+            return [make_question("What is energy?"), make_question("What is a cell?")]
+        if part == 2:
+            # Differs from part 1 only in case and punctuation, so it is a duplicate
+            return [make_question("what is ENERGY"), make_question("What is a force?")]
+        return [make_question(f"What is question {part}?")]
+
+    monkeypatch.setattr(questionnaire_service, "generate_mcq_batch", fake_batch)
+    questions = asyncio.run(generate_mcqs("physics", 4))
+
+    assert [question.Question for question in questions] == [
+        "What is energy?", "What is a cell?", "What is a force?", "What is question 3?"
+    ]
+    assert [question.QuestionNumber for question in questions] == [1, 2, 3, 4]
+    assert calls == [(2, 1, 2), (2, 2, 2), (1, 3, 3)]  # Part numbers continue across retry rounds
+
+def test_provider_error_is_raised_when_every_batch_fails(monkeypatch):
+    async def failing_batch(topic, size, part, parts):
+        raise RuntimeError("429 Resource has been exhausted")
+
+    monkeypatch.setattr(questionnaire_service, "generate_mcq_batch", failing_batch)
+    with pytest.raises(RuntimeError, match="429"):
+        asyncio.run(generate_mcqs("physics", 3))
+
+@pytest.mark.parametrize("num_questions", [None, 0, -1])
+def test_request_rejects_missing_or_non_positive_counts(num_questions):
+    with pytest.raises(ValidationError):
+        MCQRequest(topic="physics", num_questions=num_questions)
+
+def test_rate_limit_is_raised_even_when_other_batches_succeed(monkeypatch):
+    monkeypatch.setattr(questionnaire_service, "MCQ_BATCH_SIZE", 1)
+
+    async def partly_limited_batch(topic, size, part, parts):
+        if part == 2:
+            raise RuntimeError("429 Resource has been exhausted")
+        return [make_question(f"What is question {part}?")]
+
+    monkeypatch.setattr(questionnaire_service, "generate_mcq_batch", partly_limited_batch)
+    with pytest.raises(RuntimeError, match="429"):
+        asyncio.run(generate_mcqs("physics", 2))
+
+def test_requests_are_capped_at_the_configured_maximum():
+    assert MCQRequest(topic="physics", num_questions=MCQ_MAX_QUESTIONS).num_questions == MCQ_MAX_QUESTIONS
+    with pytest.raises(ValidationError):
+        MCQRequest(topic="physics", num_questions=MCQ_MAX_QUESTIONS + 1)
+    with pytest.raises(ValidationError):
+        BatchRequest(topics=["physics"], num_questions=MCQ_MAX_QUESTIONS + 1)